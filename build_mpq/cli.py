@@ -1,6 +1,7 @@
 """Command-line interface for WoW 3.3.5a MPQ patch builder."""
 
 import argparse
+import logging
 import sys
 from pathlib import Path
 
@@ -14,31 +15,59 @@ from .operations import (
     validate_mpq,
 )
 
+# Category flags accepted by the create command, in the order they are applied
+_CATEGORY_FLAGS = ("dbc", "interface", "fonts", "sound", "textures", "models", "world", "cameras")
+
+
+class _StdoutHandler(logging.Handler):
+    """Handler that writes to whatever sys.stdout is when a record is emitted.
+
+    Binding the stream at creation would keep writing to a replaced (and
+    possibly closed) stdout, e.g. a capture buffer from an earlier test.
+    """
+
+    terminator = "\n"
+
+    def emit(self, record: logging.LogRecord) -> None:
+        stream = sys.stdout
+        if stream is None:
+            return
+        try:
+            stream.write(self.format(record) + self.terminator)
+            stream.flush()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+    def flush(self) -> None:
+        with self.lock:
+            stream = sys.stdout
+            if stream is not None and hasattr(stream, "flush"):
+                stream.flush()
+
+
+def _configure_logging() -> None:
+    """Print build_mpq progress messages to stdout as plain lines."""
+    logger = logging.getLogger("build_mpq")
+    for handler in list(logger.handlers):
+        if handler.get_name() == "build-mpq-cli":
+            logger.removeHandler(handler)
+
+    handler = _StdoutHandler()
+    handler.set_name("build-mpq-cli")
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+
 def cmd_create(args: argparse.Namespace) -> int:
     """Handle the 'create' command."""
     staging_path = Path(args.path).resolve()
 
     # Build list of categories from flags
-    categories: list[str] | None = None
-    if any([args.dbc, args.interface, args.fonts, args.sound, args.textures,
-            args.models, args.world, args.cameras]):
-        categories = []
-        if args.dbc:
-            categories.append("dbc")
-        if args.interface:
-            categories.append("interface")
-        if args.fonts:
-            categories.append("fonts")
-        if args.sound:
-            categories.append("sound")
-        if args.textures:
-            categories.append("textures")
-        if args.models:
-            categories.append("models")
-        if args.world:
-            categories.append("world")
-        if args.cameras:
-            categories.append("cameras")
+    selected = [c for c in _CATEGORY_FLAGS if getattr(args, c)]
+    categories: list[str] | None = selected or None
 
     try:
         create_staging_area(staging_path, force=args.force, categories=categories)
@@ -65,6 +94,7 @@ def cmd_package(args: argparse.Namespace) -> int:
             output_path,
             compression=args.compression,
             dereference_symlinks=args.dereference,
+            dereference_mode=args.dereference_mode,
         )
         return 0
     except MPQCliNotFoundError as e:
@@ -260,6 +290,12 @@ Examples:
         action="store_false",
         help="Disable dereferencing of symbolic links (by default symlinks are dereferenced and copied into a temporary staging tree)",
     )
+    package_parser.add_argument(
+        "--dereference-mode",
+        choices=["always", "never", "auto"],
+        default=None,
+        help="Control the dereferenced staging copy: always, never, or auto (skip it when mpqcli follows symlinks itself; overrides --no-dereference)",
+    )
     package_parser.set_defaults(func=cmd_package)
 
     # Validate command
@@ -283,6 +319,8 @@ Examples:
     # Parse arguments
     args = parser.parse_args()
 
+    _configure_logging()
+
     # Execute the appropriate command
     return args.func(args)
 
@@ -1,14 +1,111 @@
 """Core operations for MPQ patch building and validation."""
 
+import asyncio
 import shutil
 import subprocess
 import os
+import stat
+import sys
 import tempfile
 import errno
-from shutil import copy2
+import functools
+import io
+import logging
+import re
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-
-from .structure import get_available_categories, get_valid_directories, is_valid_path
+from typing import Literal
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from .structure import (
+    README_FOOTER_BYTES,
+    README_HEADER_BYTES,
+    get_available_categories,
+    get_leaf_directories,
+    get_valid_directories,
+)
+
+_log = logging.getLogger("build_mpq")
+
+# The README create_staging_area writes at the top of the staging area
+_README_NAME = "README.txt"
+
+# Maximum number of broken symlinks listed individually in the package report
+_MAX_BROKEN_EXAMPLES = 20
+
+# Maximum number of invalid paths kept for the validation report
+_MAX_INVALID_EXAMPLES = 1000
+
+# Bytes of `mpqcli list` output scanned per regex pass in validate_mpq
+_LISTING_BLOCK_SIZE = 1 << 20
+
+# Lines of a _iter_line_blocks block that hold nothing but whitespace
+_BLANK_LINE = re.compile(rb"\n[^\S\n]*(?=\n|\Z)")
+
+# Below this many files the thread pool setup costs more than it saves
+_PARALLEL_CLONE_THRESHOLD = 200
+
+# Spawn mpqcli without the close-all-fds pass and with a trimmed environment.
+# Turn off if an mpqcli build depends on environment variables not listed below
+_FAST_SPAWN = True
+
+# Environment variables passed to mpqcli when _FAST_SPAWN is set: the search
+# path, the dynamic loader, locale, temp/home dirs and what Windows needs
+_SPAWN_ENV_VARS = (
+    "PATH",
+    "HOME",
+    "LANG",
+    "LC_ALL",
+    "LC_CTYPE",
+    "LD_LIBRARY_PATH",
+    "DYLD_LIBRARY_PATH",
+    "TMPDIR",
+    "SYSTEMROOT",
+    "TEMP",
+    "TMP",
+)
+
+# Result of the mpqcli symlink probe for this process (None until probed)
+_MPQCLI_FOLLOWS_SYMLINKS: bool | None = None
+
+# ioctl request number for a copy-on-write clone on Linux (_IOW(0x94, 9, int) in linux/fs.h)
+_FICLONE = 0x40049409
+
+# errno values meaning the filesystem cannot clone at all (as opposed to this one pair)
+_REFLINK_UNSUPPORTED = frozenset(
+    {errno.EOPNOTSUPP, errno.ENOTSUP, errno.ENOTTY, errno.EINVAL, errno.ENOSYS}
+)
+
+# Errors meaning an in-kernel copy is unavailable for this pair of files,
+# so _fast_copy should move on to its next strategy
+_KERNEL_COPY_UNSUPPORTED = frozenset(
+    {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP, errno.ENOTSOCK}
+)
+
+# Buffer size for the userspace copy fallback
+_COPY_BUFSIZE = 1 << 20
+
+# Extra os.open flags for _copy_file: close-on-exec where it exists, and
+# binary mode on Windows so the userspace fallback does no newline translation
+_COPY_OPEN_FLAGS = getattr(os, "O_CLOEXEC", 0) | getattr(os, "O_BINARY", 0)
+
+# Resolve symlink targets with a type-only statx(2) that may be answered from
+# cached attributes, skipping NFS/CIFS revalidation. Off by default: on local
+# disks the ctypes call costs more than os.stat, so only enable it for staging
+# areas on network filesystems
+_STATX_DONT_SYNC = False
+
+# statx(2) arguments for that lookup (values from linux/fcntl.h, linux/stat.h)
+_AT_FDCWD = -100
+_AT_STATX_DONT_SYNC = 0x4000
+_STATX_TYPE = 0x0001
+_STATX_BUFSIZE = 256  # sizeof(struct statx)
+_STATX_MODE_OFFSET = 28  # offsetof(struct statx, stx_mode)
 
 
 class MPQError(Exception):
@@ -26,6 +123,571 @@ class ValidationError(MPQError):
     pass
 
 
+def _run_capture(
+    cmd: list[str],
+    *,
+    cwd: str | Path | None = None,
+    executable: str | None = None,
+    runner: Callable[..., subprocess.CompletedProcess[str]] | None = None,
+) -> subprocess.CompletedProcess[str]:
+    """Run a short mpqcli command to completion and return its captured text output.
+
+    runner replaces subprocess.run when given; it is looked up at call time
+    otherwise. Raises subprocess.CalledProcessError on a non-zero exit. Long
+    listings are streamed by validate_mpq instead of going through here.
+    """
+    run = subprocess.run if runner is None else runner
+    return run(
+        cmd,
+        check=True,
+        capture_output=True,
+        text=True,
+        cwd=cwd,
+        executable=executable,
+        **_spawn_options(),
+    )
+
+
+def _spawn_options() -> dict[str, object]:
+    """Return the extra subprocess arguments used for every mpqcli call.
+
+    With _FAST_SPAWN set, inherited descriptors are left alone (every fd
+    this package opens is non-inheritable already, so there is nothing to
+    close) and mpqcli gets only the environment variables in _SPAWN_ENV_VARS.
+    """
+    if not _FAST_SPAWN:
+        return {}
+    env = {name: os.environ[name] for name in _SPAWN_ENV_VARS if name in os.environ}
+    return {"close_fds": False, "env": env}
+
+
+@functools.lru_cache(maxsize=1)
+def _mpqcli_path() -> str | None:
+    """Search PATH for mpqcli once and cache the absolute path."""
+    return shutil.which("mpqcli")
+
+
+def _find_mpqcli() -> str | None:
+    """Return the absolute path of mpqcli, searching PATH only until it is found.
+
+    A failed lookup is not cached, so installing mpqcli while a long-running
+    process is alive is still picked up.
+    """
+    path = _mpqcli_path()
+    if path is None:
+        _mpqcli_path.cache_clear()
+    return path
+
+
+def reset_mpqcli_cache() -> None:
+    """Forget the cached mpqcli location and symlink probe result.
+
+    Call this after mpqcli was installed, moved or replaced within a running
+    process (tests use it to isolate patched lookups).
+    """
+    global _MPQCLI_FOLLOWS_SYMLINKS
+    _mpqcli_path.cache_clear()
+    _MPQCLI_FOLLOWS_SYMLINKS = None
+
+
+def _probe_cache_path() -> Path:
+    """Return the file where the mpqcli symlink probe result is persisted."""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "build-mpq" / "mpqcli_probe"
+
+
+def _mpqcli_follows_symlinks(
+    mpqcli: str,
+    runner: Callable[..., subprocess.CompletedProcess[str]] | None = None,
+) -> bool:
+    """Return True if mpqcli stores the target of a symlink it is given.
+
+    The answer is found once by packaging a tiny tree containing a single
+    symlink and listing the result. It is cached for the process and persisted
+    to ~/.cache/build-mpq/mpqcli_probe, keyed on the mpqcli binary and its
+    modification time so an upgrade triggers a new probe. Any failure during
+    the probe is treated as "does not follow", which keeps the safe copy.
+    runner is passed on to _run_capture for both mpqcli invocations.
+    """
+    global _MPQCLI_FOLLOWS_SYMLINKS
+    if _MPQCLI_FOLLOWS_SYMLINKS is not None:
+        return _MPQCLI_FOLLOWS_SYMLINKS
+
+    try:
+        key = f"{mpqcli}\t{os.stat(mpqcli).st_mtime_ns}"
+    except OSError:
+        key = mpqcli
+
+    cache_path = _probe_cache_path()
+    try:
+        cached_key, _, cached_value = cache_path.read_text(encoding="utf-8").rpartition("\t")
+        if cached_key == key and cached_value in ("0", "1"):
+            _MPQCLI_FOLLOWS_SYMLINKS = cached_value == "1"
+            return _MPQCLI_FOLLOWS_SYMLINKS
+    except (OSError, UnicodeDecodeError):
+        pass
+
+    follows = False
+    try:
+        with tempfile.TemporaryDirectory(prefix="build_mpq_probe_") as tmpdir:
+            tmp_path = Path(tmpdir)
+            target = tmp_path / "target.txt"
+            target.write_bytes(b"build-mpq symlink probe")
+            probe_staging = tmp_path / "staging"
+            probe_staging.mkdir()
+            (probe_staging / "probe_link.txt").symlink_to(target)
+            probe_mpq = tmp_path / "probe.mpq"
+
+            _run_capture(
+                [mpqcli, "create", "--output", str(probe_mpq), "."],
+                cwd=probe_staging,
+                runner=runner,
+            )
+            listing = _run_capture([mpqcli, "list", str(probe_mpq)], runner=runner)
+            follows = "probe_link.txt" in listing.stdout
+    except (OSError, subprocess.CalledProcessError):
+        follows = False
+
+    _MPQCLI_FOLLOWS_SYMLINKS = follows
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        cache_path.write_text(f"{key}\t{int(follows)}", encoding="utf-8")
+    except OSError:
+        pass
+
+    return follows
+
+
+@functools.lru_cache(maxsize=1)
+def _libc_statx() -> Callable[[str], int | None] | None:
+    """Return a type-only statx(2) lookup on Linux, or None if it is unavailable.
+
+    The returned function gives the file type bits of what a path resolves
+    to, 0 if it cannot be resolved, or None if the kernel lacks statx. ctypes
+    and the result buffer are set up once here; the buffer is shared, so the
+    lookup is only used from the single-threaded staging walk.
+    """
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        import ctypes
+
+        libc = ctypes.CDLL(None, use_errno=True)
+        statx = libc.statx
+    except (OSError, AttributeError):
+        return None
+    statx.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_uint, ctypes.c_void_p]
+    statx.restype = ctypes.c_int
+
+    buf = ctypes.create_string_buffer(_STATX_BUFSIZE)
+    stx_mask = ctypes.c_uint32.from_buffer(buf)
+    stx_mode = ctypes.c_uint16.from_buffer(buf, _STATX_MODE_OFFSET)
+    get_errno = ctypes.get_errno
+
+    def file_type(path: str) -> int | None:
+        if statx(_AT_FDCWD, os.fsencode(path), _AT_STATX_DONT_SYNC, _STATX_TYPE, buf) != 0:
+            return None if get_errno() == errno.ENOSYS else 0
+        if not stx_mask.value & _STATX_TYPE:
+            return None
+        return stat.S_IFMT(stx_mode.value)
+
+    return file_type
+
+
+def _is_broken_symlink(entry: os.DirEntry) -> bool:
+    """Return True if the symlink entry does not resolve to an existing regular file.
+
+    Covers dangling and cyclic links as well as links to directories or
+    devices. A single entry.stat (or statx) follows the whole link chain,
+    unlike Path.resolve(strict=True) which resolves the path component by
+    component. With _STATX_DONT_SYNC set, the lookup goes through statx.
+    """
+    if _STATX_DONT_SYNC:
+        statx_type = _libc_statx()
+        file_type = statx_type(entry.path) if statx_type is not None else None
+        if file_type is not None:
+            return file_type != stat.S_IFREG
+
+    try:
+        return not entry.is_file(follow_symlinks=True)
+    except OSError:
+        # Cyclic symlink (ELOOP) or unreadable target
+        return True
+
+
+def _ancestors(directory: str) -> Iterator[str]:
+    """Yield every partial prefix of a "/"-separated path, including itself.
+
+    For example "Interface/AddOns" yields "Interface" then "Interface/AddOns".
+    """
+    index = directory.find("/")
+    while index != -1:
+        yield directory[:index]
+        index = directory.find("/", index + 1)
+    yield directory
+
+
+def _iter_staging(staging: Path) -> Iterator[tuple[str, bool, str | None]]:
+    """Walk the staging tree and yield ``(rel_path, is_symlink, target)`` per file.
+
+    Uses an explicit stack of ``os.scandir`` iterators so file types come from
+    the directory entries themselves instead of an extra ``stat`` per item,
+    and so deep trees cost no Python frames or recursion limit per level.
+    Only symlinks are stat'ed, to tell whether they resolve to a regular file.
+    ``target`` is the path to read the file from, or None for a broken,
+    cyclic or non-file symlink.
+    Directories are not yielded and symlinked directories are not followed.
+    The generated top-level README.txt is yielded like any other file; it is
+    up to callers to leave it out of their counts.
+    """
+    root = os.fspath(staging)
+    prefix_len = len(root) + len(os.sep)
+    stack = [os.scandir(root)]
+
+    try:
+        while stack:
+            try:
+                entry = next(stack[-1])
+            except StopIteration:
+                stack.pop().close()
+                continue
+
+            if entry.is_dir(follow_symlinks=False):
+                stack.append(os.scandir(entry.path))
+            elif entry.is_symlink():
+                target = None if _is_broken_symlink(entry) else entry.path
+                yield entry.path[prefix_len:], True, target
+            elif entry.is_file(follow_symlinks=False):
+                yield entry.path[prefix_len:], False, entry.path
+    finally:
+        # Release directory fds promptly if the walk is abandoned or fails
+        for it in stack:
+            it.close()
+
+
+def _count_if_symlink_free(staging: Path) -> int | None:
+    """Return the number of files in a symlink-free staging tree.
+
+    The walk stops at the first symbolic link and returns None, so trees
+    that do need dereferencing pay only for the entries seen before it.
+    """
+    count = 0
+    for rel, is_symlink, _ in _iter_staging(staging):
+        if is_symlink:
+            return None
+        if rel != _README_NAME:
+            count += 1
+    return count
+
+
+@functools.lru_cache(maxsize=1)
+def _macos_clonefile() -> Callable[[bytes, bytes, int], int] | None:
+    """Return libc's clonefile(2) on macOS, or None if it is unavailable."""
+    try:
+        import ctypes
+
+        libc = ctypes.CDLL(None, use_errno=True)
+        clonefile = libc.clonefile
+    except (OSError, AttributeError):
+        return None
+    clonefile.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_uint32]
+    clonefile.restype = ctypes.c_int
+    return clonefile
+
+
+def _reflink(src: str | Path, dst: str, caps: dict[str, bool]) -> bool:
+    """Try to create dst as a copy-on-write clone of src.
+
+    Returns True on success. On failure dst is left absent, and caps["reflink"]
+    is cleared if the error shows the filesystem has no clone support.
+    """
+    if sys.platform == "darwin":
+        clonefile = _macos_clonefile()
+        if clonefile is None:
+            caps["reflink"] = False
+            return False
+        if clonefile(os.fsencode(src), os.fsencode(dst), 0) == 0:
+            return True
+        import ctypes
+
+        if ctypes.get_errno() in _REFLINK_UNSUPPORTED:
+            caps["reflink"] = False
+        return False
+
+    if fcntl is None or not sys.platform.startswith("linux"):
+        caps["reflink"] = False
+        return False
+
+    try:
+        src_fd = os.open(src, os.O_RDONLY | os.O_CLOEXEC)
+    except OSError:
+        return False
+    try:
+        try:
+            dst_fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_CLOEXEC, 0o644)
+        except OSError:
+            return False
+        try:
+            fcntl.ioctl(dst_fd, _FICLONE, src_fd)
+        except OSError as e:
+            os.close(dst_fd)
+            os.unlink(dst)
+            if e.errno in _REFLINK_UNSUPPORTED:
+                caps["reflink"] = False
+            return False
+        os.close(dst_fd)
+    finally:
+        os.close(src_fd)
+
+    shutil.copystat(src, dst)
+    return True
+
+
+def _fast_copy(src_fd: int, dst_fd: int, size: int) -> None:
+    """Copy size bytes from src_fd to dst_fd, starting at their current offsets.
+
+    Tries copy_file_range(2) first, then sendfile(2), so the data never passes
+    through userspace, and finally a read/write loop with a 1 MiB buffer.
+    Each strategy continues from wherever the previous one stopped. As in
+    shutil, a strategy that copies nothing at all (some filesystems fail that
+    way silently) hands over to the next one; a 0 after data is EOF.
+    """
+    remaining = size
+
+    if hasattr(os, "copy_file_range"):
+        try:
+            while remaining > 0:
+                copied = os.copy_file_range(src_fd, dst_fd, remaining)
+                if copied == 0:
+                    break
+                remaining -= copied
+            else:
+                return
+            if remaining < size:
+                return
+        except OSError as e:
+            if e.errno not in _KERNEL_COPY_UNSUPPORTED:
+                raise
+
+    # sendfile only accepts regular file destinations (and offset=None) on Linux
+    if sys.platform.startswith("linux"):
+        try:
+            while remaining > 0:
+                sent = os.sendfile(dst_fd, src_fd, None, remaining)
+                if sent == 0:
+                    break
+                remaining -= sent
+            else:
+                return
+            if remaining < size:
+                return
+        except OSError as e:
+            if e.errno not in _KERNEL_COPY_UNSUPPORTED:
+                raise
+
+    with open(src_fd, "rb", closefd=False) as fsrc, open(dst_fd, "wb", closefd=False) as fdst:
+        shutil.copyfileobj(fsrc, fdst, _COPY_BUFSIZE)
+
+
+def _copy_file(src: str | Path, dst: str) -> None:
+    """Copy the contents and metadata of src to dst with _fast_copy."""
+    src_fd = os.open(src, os.O_RDONLY | _COPY_OPEN_FLAGS)
+    try:
+        dst_fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | _COPY_OPEN_FLAGS, 0o644)
+        try:
+            _fast_copy(src_fd, dst_fd, os.fstat(src_fd).st_size)
+        finally:
+            os.close(dst_fd)
+    finally:
+        os.close(src_fd)
+
+    shutil.copystat(src, dst)
+
+
+def _fast_clone(src: str | Path, dst: str, caps: dict[str, bool]) -> None:
+    """Materialize src at dst as cheaply as the filesystem allows.
+
+    Tries, in order: a copy-on-write clone (FICLONE on Linux, clonefile on
+    macOS), a hardlink, and finally a byte copy through _fast_copy.
+    """
+    if caps.get("reflink", True) and _reflink(src, dst, caps):
+        return
+
+    try:
+        os.link(src, dst)
+        return
+    except OSError as e:
+        if e.errno not in (errno.EXDEV, errno.EPERM, errno.EACCES):
+            raise
+
+    # Cross-device or permission issue -> fallback to copy
+    _copy_file(src, dst)
+
+
+def _link_all(jobs: list[tuple[str | Path, str]]) -> list[tuple[str | Path, str]]:
+    """Hardlink every (src, dst) pair in one tight loop.
+
+    Returns the pairs that cannot be hardlinked (cross-device or not
+    permitted), to be copied instead.
+    """
+    link = os.link
+    unlinkable = (errno.EXDEV, errno.EPERM, errno.EACCES)
+    leftover: list[tuple[str | Path, str]] = []
+    for job in jobs:
+        try:
+            link(*job)
+        except OSError as e:
+            if e.errno not in unlinkable:
+                raise
+            leftover.append(job)
+    return leftover
+
+
+def _clone_all(jobs: list[tuple[str | Path, str]], caps: dict[str, bool]) -> None:
+    """Run _fast_clone for every (src, dst) pair, in parallel for large trees.
+
+    Destination directories must already exist so workers never race on mkdir.
+    The first pair probes for clone support; without it the whole plan is
+    hardlinked in a single loop (one syscall per file, no thread dispatch)
+    and only the pairs that cannot be linked are copied.
+    Per-file I/O is overlapped with worker threads (each blocking syscall
+    releases the GIL) rather than an io_uring queue: a linked
+    openat -> read -> write chain cannot hand the opened fd to the next SQE
+    without registered-file slots, and most files here are cloned or
+    hardlinked with a single syscall anyway.
+    """
+    if not jobs:
+        return
+
+    _fast_clone(*jobs[0], caps)
+    jobs = jobs[1:]
+    if not caps.get("reflink", True):
+        jobs = _link_all(jobs)
+        clone = _copy_file
+    else:
+        clone = functools.partial(_fast_clone, caps=caps)
+
+    if len(jobs) < _PARALLEL_CLONE_THRESHOLD:
+        for src, dst in jobs:
+            clone(src, dst)
+        return
+
+    max_workers = min(32, (os.cpu_count() or 1) * 4)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(clone, src, dst) for src, dst in jobs]
+        try:
+            for future in as_completed(futures):
+                future.result()
+        except BaseException:
+            # Surface the first failure without waiting for queued copies
+            pool.shutdown(wait=True, cancel_futures=True)
+            raise
+
+
+def _dereference_temp_dir(staging_path: Path) -> tempfile.TemporaryDirectory:
+    """Create the temporary directory for the dereferenced copy.
+
+    It is placed next to the staging area so both are on the same filesystem
+    and the copy can be built from hardlinks; $TMPDIR is often a separate
+    tmpfs, where os.link fails with EXDEV and every byte would be copied.
+    Falls back to the default temporary location if the parent directory is
+    not writable.
+    """
+    try:
+        return tempfile.TemporaryDirectory(prefix=".build_mpq_", dir=staging_path.parent)
+    except OSError:
+        return tempfile.TemporaryDirectory(prefix="build_mpq_")
+
+
+def _materialize(
+    staging: Path,
+    temp_root: Path | None,
+    counters: dict[str, int],
+) -> list[str]:
+    """Classify the staging files and optionally build a dereferenced copy in one walk.
+
+    Args:
+        staging: Path to the staging area directory
+        temp_root: Directory to populate with clones/hardlinks of every file,
+                   with symlinks replaced by their targets. If None, the tree
+                   is only classified.
+        counters: Updated in place with "files" (valid files, including valid
+                  symlinks), "symlinks" and "broken" counts. Broken symlinks
+                  are skipped silently; reporting them is up to the caller.
+                  The generated README.txt is copied but not counted.
+
+    Returns:
+        Relative paths of up to _MAX_BROKEN_EXAMPLES broken symbolic links
+    """
+    broken_examples: list[str] = []
+    created_dirs: set[str] = set()
+    jobs: list[tuple[str | Path, str]] = []
+    temp_root_str = os.fspath(temp_root) if temp_root is not None else None
+    if temp_root_str is not None:
+        os.makedirs(temp_root_str, exist_ok=True)
+        created_dirs.add(temp_root_str)
+
+    for rel, is_symlink, target in _iter_staging(staging):
+        if rel == _README_NAME and not is_symlink:
+            # Packed like on every other path (mpqcli sees the whole staging
+            # tree when no copy is made), but not reported as content
+            if temp_root_str is not None:
+                jobs.append((target, os.path.join(temp_root_str, rel)))
+            continue
+
+        if is_symlink:
+            counters["symlinks"] += 1
+            if target is None:
+                # Broken, cyclic or non-file symlink; reported once by the caller
+                counters["broken"] += 1
+                if len(broken_examples) < _MAX_BROKEN_EXAMPLES:
+                    broken_examples.append(rel)
+                continue
+
+        counters["files"] += 1
+
+        if temp_root_str is None:
+            continue
+
+        if is_symlink:
+            # os.link does not follow symlinks, so hand it the real target
+            target = os.path.realpath(target)
+
+        dest_file = os.path.join(temp_root_str, rel)
+        dest_root = os.path.dirname(dest_file)
+        if dest_root not in created_dirs:
+            os.makedirs(dest_root, exist_ok=True)
+            created_dirs.add(dest_root)
+
+        jobs.append((target, dest_file))
+
+    # Prefer clones or hardlinks to avoid duplicating large files
+    if jobs:
+        _clone_all(jobs, {"reflink": True})
+
+    return broken_examples
+
+
+def _write_all(fd: int, chunks: list[bytes]) -> None:
+    """Write every chunk to fd in order, with one writev where available."""
+    if not hasattr(os, "writev"):
+        for chunk in chunks:
+            view = memoryview(chunk)
+            while view:
+                view = view[os.write(fd, view):]
+        return
+
+    pending: list[bytes | memoryview] = [c for c in chunks if c]
+    while pending:
+        written = os.writev(fd, pending)
+        # Drop what was written; a short write resumes mid-chunk
+        while pending and written >= len(pending[0]):
+            written -= len(pending[0])
+            pending.pop(0)
+        if pending:
+            pending[0] = memoryview(pending[0])[written:]
+
+
 def create_staging_area(
     base_path: Path,
     *,
@@ -62,73 +724,75 @@ def create_staging_area(
             )
 
     if force and base_path.exists():
-        print(f"Removing existing staging area at {base_path}")
+        _log.info("Removing existing staging area at %s", base_path)
         shutil.rmtree(base_path)
 
-    print(f"Creating staging area at {base_path}")
+    _log.info("Creating staging area at %s", base_path)
     if categories:
-        print(f"Categories: {', '.join(categories)}")
+        _log.info("Categories: %s", ", ".join(categories))
 
     directories = get_valid_directories(categories)
-
-    for directory in directories:
-        dir_path = base_path / directory
-        dir_path.mkdir(parents=True, exist_ok=True)
+    leaves = get_leaf_directories(categories)
+
+    # Create every directory exactly once; sorting puts each ancestor before
+    # its descendants, so unlike os.makedirs no ancestor is stat'ed per leaf
+    base_path.mkdir(parents=True, exist_ok=True)
+    unique_dirs = sorted({p for d in leaves for p in _ancestors(d)})
+    root = os.fspath(base_path)
+    for directory in unique_dirs:
+        try:
+            # Plain string joins; no Path object per directory
+            os.mkdir(os.path.join(root, directory))
+        except FileExistsError:
+            pass
 
     # Create a README in the staging area
-    readme_path = base_path / "README.txt"
+    readme_path = base_path / _README_NAME
 
-    category_info = ""
+    category_block = b""
     if categories:
-        category_info = f"\nCreated categories: {', '.join(categories)}\n"
+        category_block = f"\nCreated categories: {', '.join(categories)}\n".encode("utf-8")
 
-    readme_content = f"""WoW 3.3.5a Patch Staging Area
-================================
-{category_info}
-This directory structure is required by the WoW 3.3.5a client.
-Place your custom files in the appropriate directories:
+    fd = os.open(
+        readme_path,
+        os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_CLOEXEC", 0),
+        0o644,
+    )
+    try:
+        _write_all(fd, [README_HEADER_BYTES, category_block, README_FOOTER_BYTES])
+    finally:
+        os.close(fd)
 
-- DBFilesClient/       - DBC files (game data tables)
-- Interface/           - UI, icons, and interface assets
-- Fonts/               - Font files
-- Sound/               - Audio files (music, effects, voices)
-- Textures/            - Environment textures, minimaps
-- Character/           - Character models
-- Creature/           - Creature models
-- Item/                - Item models
-- Spells/              - Spell effects and models
-- World/               - Map data (ADT, WDT, WMO files)
-- Cameras/             - Camera files
+    _log.info("✓ Created %d directories", len(directories))
 
-After placing your files, use:
-  build-mpq package <staging_dir> <output.mpq>
 
-To validate the MPQ:
-  build-mpq validate <output.mpq>
-"""
-    readme_path.write_text(readme_content, encoding="utf-8")
+def _absolute(path: Path) -> str:
+    """Return path made absolute like Path.absolute(), as a str.
 
-    print(f"✓ Created {len(directories)} directories")
+    Unlike os.path.abspath, ".." components are kept, so a symlink before
+    them is followed by the OS rather than collapsed lexically. getcwd is
+    only called for relative paths.
+    """
+    path_str = os.fspath(path)
+    if os.path.isabs(path_str):
+        return path_str
+    return os.path.join(os.getcwd(), path_str)
 
 
-def package_mpq(
+def _prepare_package(
     staging_path: Path,
     output_path: Path,
     *,
-    compression: str = "z",
-    dereference_symlinks: bool = True,
-) -> None:
-    """Package the staging area into an MPQ file using mpqcli.
-
-    Args:
-        staging_path: Path to the staging area directory
-        output_path: Path where the MPQ file will be created
-        compression: Compression method (z=zlib, b=bzip2, n=none)
-
-    Raises:
-        MPQCliNotFoundError: If mpqcli is not found in PATH
-        FileNotFoundError: If staging_path doesn't exist
-        MPQError: If mpqcli fails
+    compression: str,
+    dereference_symlinks: bool,
+    dereference_mode: Literal["always", "never", "auto"] | None,
+    runner: Callable[..., subprocess.CompletedProcess[str]] | None = None,
+) -> tuple[list[str], str, str, Path, tempfile.TemporaryDirectory | None]:
+    """Validate the arguments and lay out everything mpqcli create needs.
+
+    Shared by package_mpq and package_mpq_async. Returns the command, the
+    absolute output path, the mpqcli path, the directory to run it in and
+    the temporary dereferenced copy (or None), which the caller must clean up.
     """
     if not staging_path.exists():
         raise FileNotFoundError(f"Staging area not found: {staging_path}")
@@ -136,28 +800,47 @@ def package_mpq(
     if not staging_path.is_dir():
         raise NotADirectoryError(f"Staging path is not a directory: {staging_path}")
 
+    if dereference_mode is None:
+        dereference_mode = "always" if dereference_symlinks else "never"
+    elif dereference_mode not in ("always", "never", "auto"):
+        raise ValueError(
+            f"Invalid dereference mode: {dereference_mode}. "
+            "Valid modes: always, never, auto"
+        )
+
     # Check if mpqcli is available
-    if not shutil.which("mpqcli"):
+    mpqcli = _find_mpqcli()
+    if not mpqcli:
         raise MPQCliNotFoundError(
             "mpqcli not found in PATH. Please install mpqcli first.\n"
             "Installation instructions: https://github.com/thegraydot/mpqcli"
         )
 
+    if dereference_mode == "auto":
+        dereference_symlinks = not _mpqcli_follows_symlinks(mpqcli, runner=runner)
+        if not dereference_symlinks:
+            _log.info("mpqcli follows symbolic links; skipping dereferenced copy")
+    else:
+        dereference_symlinks = dereference_mode == "always"
+
+    # Computed once and reused for every check and the mpqcli argument
+    abs_out = _absolute(output_path)
+
     # Remove existing MPQ if present
-    if output_path.exists():
-        if output_path.is_dir():
+    if os.path.exists(abs_out):
+        if os.path.isdir(abs_out):
             raise IsADirectoryError(f"Output path is a directory: {output_path}")
 
-        print(f"Removing existing MPQ: {output_path}")
-        output_path.unlink()
+        _log.info("Removing existing MPQ: %s", output_path)
+        os.unlink(abs_out)
 
-    output_dir = output_path.parent
-    if not output_dir.exists():
-        print(f"Creating output directory: {output_dir}")
-        output_dir.mkdir(parents=True, exist_ok=True)
+    output_dir = os.path.dirname(abs_out)
+    if not os.path.exists(output_dir):
+        _log.info("Creating output directory: %s", output_dir)
+        os.makedirs(output_dir, exist_ok=True)
 
-    print(f"Packaging {staging_path} -> {output_path}")
-    print(f"Compression: {compression}")
+    _log.info("Packaging %s -> %s", staging_path, output_path)
+    _log.info("Compression: %s", compression)
 
     # Build the mpqcli command
     # Correct usage: mpqcli create --output <output.mpq> <target_dir>
@@ -166,159 +849,314 @@ def package_mpq(
         "mpqcli",
         "create",
         "--output",
-        str(output_path.absolute()),
+        abs_out,
         ".",
     ]
 
-    # Add all files from staging area (including symlink targets) for reporting only
-    files_to_add: list[Path] = []
-    broken_symlinks: list[Path] = []
-    symlink_count = 0
-
-    for item in staging_path.rglob("*"):
-        # Skip the README.txt
-        if item.name == "README.txt":
-            continue
-
-        # Handle symlinks - check if they resolve correctly
-        if item.is_symlink():
-            symlink_count += 1
-            try:
-                # Verify the symlink target exists and is a file
-                if item.resolve(strict=True).is_file():
-                    files_to_add.append(item)
-                else:
-                    broken_symlinks.append(item)
-            except (OSError, RuntimeError) as e:
-                # Broken or cyclic symlink
-                broken_symlinks.append(item)
-        elif item.is_file():
-            # Regular file
-            files_to_add.append(item)
-
-    # Report findings
-    if symlink_count > 0:
-        print(f"Found {symlink_count} symbolic link(s)")
-
-    if broken_symlinks:
-        print(f"\n⚠ Warning: {len(broken_symlinks)} broken symbolic link(s) detected:")
-        for link in broken_symlinks:
-            relative = link.relative_to(staging_path)
-            try:
-                target = link.readlink()
-                print(f"  - {relative} -> {target} (target not found)")
-            except OSError:
-                print(f"  - {relative} (unreadable symlink)")
-        print("\nThese files will be skipped in the MPQ.")
-
-    if not files_to_add:
-        print("⚠ Warning: No valid files found in staging area")
-        print("   The MPQ will be created but will be empty.")
-    else:
-        valid_regular = len(files_to_add) - (symlink_count - len(broken_symlinks))
-        valid_symlinks = symlink_count - len(broken_symlinks)
-        print(f"Packaging {len(files_to_add)} file(s): {valid_regular} regular, {valid_symlinks} symlinked")
-
     # Note: we do NOT pass individual files to mpqcli; we pass the staging directory as the target
     # This preserves the file paths inside the MPQ and avoids adding absolute host paths.
 
+    counters = {"files": 0, "symlinks": 0, "broken": 0}
+    classified = False
+    if dereference_symlinks:
+        # A tree without symlinks (e.g. a clean CI checkout) needs neither the
+        # copy nor the classification pass; the probe already counted its files
+        file_count = _count_if_symlink_free(staging_path)
+        if file_count is not None:
+            counters["files"] = file_count
+            classified = True
+            dereference_symlinks = False
+
     # By default we dereference symlinks by creating a temporary staging copy with files copied
     temp_dir_obj = None
+    temp_root = None
     run_cwd = staging_path
     if dereference_symlinks:
-        temp_dir_obj = tempfile.TemporaryDirectory(prefix="build_mpq_")
+        temp_dir_obj = _dereference_temp_dir(staging_path)
         temp_root = Path(temp_dir_obj.name) / staging_path.name
+        run_cwd = temp_root
 
-        print(f"Creating dereferenced staging copy at {temp_root}")
-
-        # Walk the staging tree and copy files; dereference symlinks by copying their targets
-        for root, dirs, files in os.walk(staging_path):
-            root_path = Path(root)
-            rel_root = root_path.relative_to(staging_path)
-            dest_root = temp_root / rel_root
-            dest_root.mkdir(parents=True, exist_ok=True)
-
-            for fname in files:
-                src_file = root_path / fname
-                dest_file = dest_root / fname
-
-                if src_file.is_symlink():
-                    try:
-                        target = src_file.resolve(strict=True)
-                        if target.is_file():
-                            # Try to create a hard link to save space; fall back to copy on cross-device or permission errors
-                            try:
-                                os.link(target, dest_file)
-                            except OSError as e:
-                                if e.errno in (errno.EXDEV, errno.EPERM, errno.EACCES):
-                                    # Cross-device or permission issue -> fallback to copy
-                                    copy2(target, dest_file)
-                                else:
-                                    raise
-                        else:
-                            # Skip non-file symlink targets
-                            print(f"Skipping non-file symlink target: {src_file}")
-                    except (OSError, RuntimeError):
-                        # Broken symlink; skip and warn
-                        print(f"Skipping broken symlink: {src_file}")
-                elif src_file.is_file():
-                    # For regular files, prefer hardlinks to avoid duplicating large files
-                    try:
-                        os.link(src_file, dest_file)
-                    except OSError as e:
-                        if e.errno in (errno.EXDEV, errno.EPERM, errno.EACCES):
-                            copy2(src_file, dest_file)
-                        else:
-                            raise
+        _log.info("Creating dereferenced staging copy at %s", temp_root)
 
+    # Classify files for reporting and build the dereferenced copy in the same walk
+    broken_examples: list[str] = []
+    if not classified:
+        try:
+            broken_examples = _materialize(staging_path, temp_root, counters)
+        except BaseException:
+            if temp_dir_obj is not None:
+                temp_dir_obj.cleanup()
+            raise
+
+    if dereference_mode == "auto" and temp_dir_obj is None and counters["broken"]:
+        # The probe only covers a valid link; broken ones would reach mpqcli
+        # as-is, so fall back to the copy, which leaves them out
+        temp_dir_obj = _dereference_temp_dir(staging_path)
+        temp_root = Path(temp_dir_obj.name) / staging_path.name
         run_cwd = temp_root
+        _log.info("Broken symbolic links found; creating dereferenced staging copy at %s", temp_root)
+        counters = {"files": 0, "symlinks": 0, "broken": 0}
+        try:
+            broken_examples = _materialize(staging_path, temp_root, counters)
+        except BaseException:
+            temp_dir_obj.cleanup()
+            raise
 
-    # Print the command for easier diagnostics
-    print(f"Running command: {' '.join(cmd)} (cwd={run_cwd})")
+    symlink_count = counters["symlinks"]
+    broken_count = counters["broken"]
 
-    try:
-        result = subprocess.run(
-            cmd,
-            check=True,
-            capture_output=True,
-            text=True,
-            cwd=run_cwd,
+    # Report findings
+    if symlink_count > 0:
+        _log.info("Found %d symbolic link(s)", symlink_count)
+
+    if broken_count:
+        # Build the whole report first so it is emitted as a single write
+        report = io.StringIO()
+        report.write(f"\n⚠ Warning: {broken_count} broken symbolic link(s) detected:\n")
+        for relative in broken_examples:
+            link = os.path.join(staging_path, relative)
+            try:
+                target = os.readlink(link)
+            except OSError:
+                report.write(f"  - {relative} (unreadable symlink)\n")
+                continue
+            reason = "not a regular file" if os.path.exists(link) else "target not found"
+            report.write(f"  - {relative} -> {target} ({reason})\n")
+        if broken_count > len(broken_examples):
+            report.write(f"  ... and {broken_count - len(broken_examples)} more\n")
+        if temp_dir_obj is not None:
+            report.write("\nThese files will be skipped in the MPQ.")
+        else:
+            report.write("\nThese links are passed to mpqcli unchanged.")
+        _log.warning(report.getvalue())
+
+    if not counters["files"]:
+        _log.warning("⚠ Warning: No valid files found in staging area")
+        _log.warning("   The MPQ will be created but will be empty.")
+    else:
+        valid_symlinks = symlink_count - broken_count
+        valid_regular = counters["files"] - valid_symlinks
+        _log.info(
+            "Packaging %d file(s): %d regular, %d symlinked",
+            counters["files"],
+            valid_regular,
+            valid_symlinks,
         )
 
-        if result.stdout:
-            print(result.stdout)
+    # Print the command for easier diagnostics
+    _log.info("Running command: %s (cwd=%s)", " ".join(cmd), run_cwd)
+
+    return cmd, abs_out, mpqcli, run_cwd, temp_dir_obj
+
+
+def _report_packaged(abs_out: str, stdout: str) -> None:
+    """Log the mpqcli output and the size of the MPQ it created."""
+    if stdout:
+        _log.info("%s", stdout.rstrip("\n"))
+
+    _log.info("✓ Successfully created MPQ: %s", abs_out)
+
+    # Show file size
+    size_mb = os.stat(abs_out).st_size / (1024 * 1024)
+    _log.info("  Size: %.2f MB", size_mb)
 
-        print(f"✓ Successfully created MPQ: {output_path.absolute()}")
 
-        # Show file size
-        size_mb = output_path.stat().st_size / (1024 * 1024)
-        print(f"  Size: {size_mb:.2f} MB")
+def _mpqcli_failed(
+    cmd: list[str], staging_path: Path, returncode: int, stderr: str | None
+) -> MPQError:
+    """Build the MPQError reported when mpqcli create exits non-zero."""
+    # Include the invoked command and working directory to aid debugging
+    error_msg = (
+        f"mpqcli failed with exit code {returncode}\n"
+        f"Command: {' '.join(cmd)}\n"
+        f"Cwd: {staging_path}\n"
+    )
+    if stderr:
+        error_msg += f"{stderr}"
+    return MPQError(error_msg)
 
+
+def _cleanup_temp(temp_dir_obj: tempfile.TemporaryDirectory | None) -> None:
+    """Remove the temporary dereferenced copy, if one was created."""
+    if temp_dir_obj is not None:
+        try:
+            temp_dir_obj.cleanup()
+        except Exception:
+            pass
+
+
+def package_mpq(
+    staging_path: Path,
+    output_path: Path,
+    *,
+    compression: str = "z",
+    dereference_symlinks: bool = True,
+    dereference_mode: Literal["always", "never", "auto"] | None = None,
+    runner: Callable[..., subprocess.CompletedProcess[str]] | None = None,
+) -> None:
+    """Package the staging area into an MPQ file using mpqcli.
+
+    Args:
+        staging_path: Path to the staging area directory
+        output_path: Path where the MPQ file will be created
+        compression: Compression method (z=zlib, b=bzip2, n=none)
+        dereference_symlinks: If True, run mpqcli from a temporary copy of the
+                              staging area with symlinks replaced by their targets
+        dereference_mode: Overrides dereference_symlinks when given.
+                          "always" and "never" force the copy on or off;
+                          "auto" skips it if mpqcli is found to follow
+                          symlinks itself (probed once and cached)
+        runner: Called instead of subprocess.run to invoke mpqcli, with the
+                same arguments (for tests and embedding); also used for the
+                "auto" probe
+
+    Raises:
+        MPQCliNotFoundError: If mpqcli is not found in PATH
+        FileNotFoundError: If staging_path doesn't exist
+        ValueError: If dereference_mode is not a valid mode
+        MPQError: If mpqcli fails
+    """
+    cmd, abs_out, mpqcli, run_cwd, temp_dir_obj = _prepare_package(
+        staging_path,
+        output_path,
+        compression=compression,
+        dereference_symlinks=dereference_symlinks,
+        dereference_mode=dereference_mode,
+        runner=runner,
+    )
+
+    try:
+        result = _run_capture(cmd, cwd=run_cwd, executable=mpqcli, runner=runner)
+        _report_packaged(abs_out, result.stdout)
     except subprocess.CalledProcessError as e:
-        # Include the invoked command and working directory to aid debugging
-        error_msg = (
-            f"mpqcli failed with exit code {e.returncode}\n"
-            f"Command: {' '.join(cmd)}\n"
-            f"Cwd: {staging_path}\n"
-        )
-        if e.stderr:
-            error_msg += f"{e.stderr}"
-        raise MPQError(error_msg) from e
+        raise _mpqcli_failed(cmd, staging_path, e.returncode, e.stderr) from e
     finally:
         # Cleanup temporary staging copy if created
-        if temp_dir_obj is not None:
-            try:
-                temp_dir_obj.cleanup()
-            except Exception:
-                pass
+        _cleanup_temp(temp_dir_obj)
+
+
+async def package_mpq_async(
+    staging_path: Path,
+    output_path: Path,
+    *,
+    compression: str = "z",
+    dereference_symlinks: bool = True,
+    dereference_mode: Literal["always", "never", "auto"] | None = None,
+) -> None:
+    """Package the staging area like package_mpq, awaiting mpqcli instead of blocking.
+
+    The staging checks and the dereferenced copy are still done synchronously;
+    only the mpqcli run is awaited, so several packages can be built
+    concurrently with asyncio.gather. Arguments and exceptions are the same
+    as for package_mpq.
+    """
+    cmd, abs_out, mpqcli, run_cwd, temp_dir_obj = _prepare_package(
+        staging_path,
+        output_path,
+        compression=compression,
+        dereference_symlinks=dereference_symlinks,
+        dereference_mode=dereference_mode,
+    )
+
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            executable=mpqcli,
+            cwd=run_cwd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            **_spawn_options(),
+        )
+        try:
+            stdout, stderr = await proc.communicate()
+        except asyncio.CancelledError:
+            # Do not leave mpqcli writing a half-built archive behind
+            proc.kill()
+            await proc.wait()
+            raise
+
+        if proc.returncode:
+            raise _mpqcli_failed(
+                cmd, staging_path, proc.returncode, stderr.decode(errors="replace")
+            )
+        _report_packaged(abs_out, stdout.decode(errors="replace"))
+    finally:
+        _cleanup_temp(temp_dir_obj)
+
+
+def _iter_line_blocks(stream: io.BufferedIOBase) -> Iterator[bytes]:
+    """Yield the stream in large blocks of whole lines, each preceded by a newline.
+
+    A block starts with the newline that ended the previous block, so every
+    line in it is found by the same newline-anchored regex.
+    """
+    carry = b"\n"
+    while chunk := stream.read(_LISTING_BLOCK_SIZE):
+        cut = chunk.rfind(b"\n")
+        if cut < 0:
+            carry += chunk
+            continue
+        yield carry + chunk[:cut]
+        carry = chunk[cut:]
+    if len(carry) > 1:
+        yield carry
+
 
+def _alternation(directories: list[str]) -> bytes:
+    """Build a regex matching any of the directories, factored on leading components.
 
-def validate_mpq(mpq_path: Path, *, verbose: bool = False) -> bool:
+    Factoring keeps the regex engine from retrying every full directory at
+    each line; either path separator is accepted.
+    """
+    groups: dict[str, list[str]] = {}
+    for directory in directories:
+        head, _, rest = directory.partition("/")
+        groups.setdefault(head, []).append(rest)
+
+    parts = []
+    for head, rests in groups.items():
+        part = re.escape(head.encode("utf-8"))
+        subs = [rest for rest in rests if rest]
+        if subs:
+            inner = rb"[/\\](?:" + _alternation(subs) + rb")"
+            part += inner if len(subs) == len(rests) else rb"(?:" + inner + rb")?"
+        parts.append(part)
+    return b"|".join(parts)
+
+
+@functools.lru_cache(maxsize=1)
+def _listing_patterns() -> tuple[re.Pattern[bytes], re.Pattern[bytes]]:
+    """Compile (once) the regexes validate_mpq runs over blocks from _iter_line_blocks.
+
+    The first captures the (stripped) paths outside the valid directories;
+    the second matches every non-blank line, with group "ok" set for valid ones.
+    """
+    directories = get_valid_directories()
+    valid = rb"(?:" + (_alternation(directories) or rb"(?!)") + rb")"
+    invalid_line = re.compile(
+        rb"\n[^\S\n]*(?!" + valid + rb"(?:[/\\]|[^\S\n]*(?:\n|\Z)))"
+        rb"(\S[^\n]*?)[^\S\n]*(?=\n|\Z)"
+    )
+    listing_line = re.compile(
+        rb"\n[^\S\n]*(?P<path>(?P<ok>" + valid + rb"(?:[/\\][^\n]*?)?)|\S[^\n]*?)"
+        rb"[^\S\n]*(?=\n|\Z)"
+    )
+    return invalid_line, listing_line
+
+
+def validate_mpq(
+    mpq_path: Path,
+    *,
+    verbose: bool = False,
+    popen: Callable[..., subprocess.Popen] | None = None,
+) -> bool:
     """Validate that an MPQ file follows the WoW 3.3.5a directory structure.
 
     Args:
         mpq_path: Path to the MPQ file to validate
         verbose: If True, print detailed validation information
+        popen: Called instead of subprocess.Popen to stream the mpqcli
+               listing, with the same arguments (for tests and embedding)
 
     Returns:
         True if validation passes
@@ -331,69 +1169,88 @@ def validate_mpq(mpq_path: Path, *, verbose: bool = False) -> bool:
     if not mpq_path.exists():
         raise FileNotFoundError(f"MPQ file not found: {mpq_path}")
 
-    if not shutil.which("mpqcli"):
+    mpqcli = _find_mpqcli()
+    if not mpqcli:
         raise MPQCliNotFoundError(
             "mpqcli not found in PATH. Please install mpqcli first."
         )
 
-    print(f"Validating MPQ: {mpq_path}")
+    _log.info("Validating MPQ: %s", mpq_path)
 
     # List files in the MPQ
-    cmd = ["mpqcli", "list", str(mpq_path.absolute())]
-
-    try:
-        result = subprocess.run(
-            cmd,
-            check=True,
-            capture_output=True,
-            text=True,
-        )
-
-        file_list = result.stdout.strip().split("\n") if result.stdout.strip() else []
-
-        if not file_list or (len(file_list) == 1 and not file_list[0]):
-            print("⚠ Warning: MPQ appears to be empty")
-            return True
-
-        print(f"Found {len(file_list)} files in MPQ")
+    cmd = ["mpqcli", "list", _absolute(mpq_path)]
 
-        # Validate each file path
-        invalid_paths: list[str] = []
-        valid_count = 0
+    # Stream the listing so memory stays bounded by the invalid-path sample
+    # rather than the full output; stderr goes to a file so a chatty mpqcli
+    # cannot block on a full pipe while we are reading stdout
+    invalid_paths: list[str] = []
+    invalid_count = 0
+    valid_count = 0
 
-        for file_path in file_list:
-            file_path = file_path.strip()
-            if not file_path:
-                continue
+    invalid_line, listing_line = _listing_patterns()
 
-            if is_valid_path(file_path):
-                valid_count += 1
-                if verbose:
-                    print(f"  ✓ {file_path}")
-            else:
-                invalid_paths.append(file_path)
+    spawn = subprocess.Popen if popen is None else popen
+    with tempfile.TemporaryFile() as stderr_file:
+        with spawn(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=stderr_file,
+            bufsize=1 << 20,
+            executable=mpqcli,
+            **_spawn_options(),
+        ) as proc:
+            # Whole blocks of lines are matched as bytes by the regex engine;
+            # paths are only decoded when printed or kept
+            for block in _iter_line_blocks(proc.stdout):
                 if verbose:
-                    print(f"  ✗ {file_path}")
-
-        print(f"\nValidation Results:")
-        print(f"  Valid files:   {valid_count}")
-        print(f"  Invalid files: {len(invalid_paths)}")
-
-        if invalid_paths:
-            print("\n⚠ The following files are in invalid locations:")
-            for path in invalid_paths:
-                print(f"  - {path}")
-            print("\nThese files will NOT be loaded by the WoW 3.3.5a client!")
-            print("Please move them to the correct directories in your staging area.")
-            raise ValidationError(
-                f"{len(invalid_paths)} file(s) in invalid locations"
-            )
-
-        print("\n✓ All files are in valid WoW 3.3.5a directories")
+                    for match in listing_line.finditer(block):
+                        file_path = match.group("path").decode("utf-8", "replace")
+                        if match.group("ok") is not None:
+                            valid_count += 1
+                            _log.info("  ✓ %s", file_path)
+                        else:
+                            invalid_count += 1
+                            if len(invalid_paths) < _MAX_INVALID_EXAMPLES:
+                                invalid_paths.append(file_path)
+                            _log.info("  ✗ %s", file_path)
+                    continue
+
+                lines = block.count(b"\n") - len(_BLANK_LINE.findall(block))
+                invalid = invalid_line.findall(block)
+                invalid_count += len(invalid)
+                valid_count += lines - len(invalid)
+                room = _MAX_INVALID_EXAMPLES - len(invalid_paths)
+                invalid_paths.extend(p.decode("utf-8", "replace") for p in invalid[:room])
+
+        if proc.returncode != 0:
+            stderr_file.seek(0)
+            stderr = stderr_file.read().decode("utf-8", "replace")
+            error_msg = f"mpqcli failed with exit code {proc.returncode}"
+            if stderr:
+                error_msg += f"\n{stderr}"
+            raise MPQError(error_msg)
+
+    if not valid_count and not invalid_count:
+        _log.warning("⚠ Warning: MPQ appears to be empty")
         return True
 
-    except subprocess.CalledProcessError as e:
-        error_msg = f"mpqcli failed with exit code {e.returncode}"
-        if e.stderr:
-            error_msg += f"\n{e.stderr}"
-        raise MPQError(error_msg) from e
+    _log.info("Found %d files in MPQ", valid_count + invalid_count)
+
+    _log.info("\nValidation Results:")
+    _log.info("  Valid files:   %d", valid_count)
+    _log.info("  Invalid files: %d", invalid_count)
+
+    if invalid_count:
+        _log.warning("\n⚠ The following files are in invalid locations:")
+        for path in invalid_paths:
+            _log.warning("  - %s", path)
+        if invalid_count > len(invalid_paths):
+            _log.warning("  ... and %d more", invalid_count - len(invalid_paths))
+        _log.warning("\nThese files will NOT be loaded by the WoW 3.3.5a client!")
+        _log.warning("Please move them to the correct directories in your staging area.")
+        raise ValidationError(
+            f"{invalid_count} file(s) in invalid locations"
+        )
+
+    _log.info("\n✓ All files are in valid WoW 3.3.5a directories")
+    return True
@@ -5,14 +5,16 @@ expects for various asset types. These paths are hard-coded in the client and
 must be followed exactly.
 """
 
+import functools
+from itertools import chain
 from typing import Final
 
 # Directory structure organized by category
-CATEGORIES: Final[dict[str, list[str]]] = {
-    "dbc": [
+CATEGORIES: Final[dict[str, tuple[str, ...]]] = {
+    "dbc": (
         "DBFilesClient",
-    ],
-    "interface": [
+    ),
+    "interface": (
         "Interface/AddOns",
         "Interface/Buttons",
         "Interface/Cinematics",
@@ -40,11 +42,11 @@ CATEGORIES: Final[dict[str, list[str]]] = {
         "Interface/TradeSkillFrame",
         "Interface/WorldMap",
         "Interface/WorldStateFrame",
-    ],
-    "fonts": [
+    ),
+    "fonts": (
         "Fonts",
-    ],
-    "sound": [
+    ),
+    "sound": (
         "Sound/Ambience",
         "Sound/Creature",
         "Sound/Doodad",
@@ -54,34 +56,116 @@ CATEGORIES: Final[dict[str, list[str]]] = {
         "Sound/Item",
         "Sound/Music",
         "Sound/Spells",
-    ],
-    "textures": [
+    ),
+    "textures": (
         "Textures/Minimap",
         "Textures/BakedNpcTextures",
-    ],
-    "models": [
+    ),
+    "models": (
         "Character",
         "Creature",
         "Item",
         "Spells",
-    ],
-    "world": [
+    ),
+    "world": (
         "World/Maps",
         "World/Minimaps",
         "World/wmo",
-    ],
-    "cameras": [
+    ),
+    "cameras": (
         "Cameras",
-    ],
+    ),
 }
 
 # The complete canonical WoW 3.3.5a patch directory structure
 # These are the ONLY paths the client will scan for specific asset types
-WOW_335_STRUCTURE: Final[list[str]] = [
-    path
-    for category_paths in CATEGORIES.values()
-    for path in category_paths
-]
+WOW_335_STRUCTURE: Final[tuple[str, ...]] = tuple(
+    chain.from_iterable(CATEGORIES.values())
+)
+
+
+# The same mapping flattened into parallel tuples: _CAT_DIRS[i] belongs to
+# category _CAT_NAMES[_CAT_IDS[i]], in WOW_335_STRUCTURE order
+_CAT_NAMES: Final[tuple[str, ...]] = tuple(CATEGORIES)
+_CAT_DIRS: Final[tuple[str, ...]] = WOW_335_STRUCTURE
+_CAT_IDS: Final[tuple[int, ...]] = tuple(
+    cat_id for cat_id, dirs in enumerate(CATEGORIES.values()) for _ in dirs
+)
+
+
+def _compute_leaves(directories: tuple[str, ...] | list[str]) -> tuple[str, ...]:
+    """Drop every directory that is an ancestor of another one in the list.
+
+    Creating just the leaves (and their ancestors) yields the same tree as
+    creating every entry.
+    """
+    leaves: list[str] = []
+    for directory in sorted(set(directories), key=len, reverse=True):
+        if not any(leaf.startswith(directory + "/") for leaf in leaves):
+            leaves.append(directory)
+    return tuple(sorted(leaves))
+
+
+# The deepest directories of the structure; their ancestors cover the rest
+LEAF_DIRS: Final[tuple[str, ...]] = _compute_leaves(WOW_335_STRUCTURE)
+
+# Static parts of the staging README.txt; create_staging_area writes the
+# optional category line between them
+README_HEADER_BYTES: Final[bytes] = b"""WoW 3.3.5a Patch Staging Area
+================================
+"""
+
+README_FOOTER_BYTES: Final[bytes] = b"""
+This directory structure is required by the WoW 3.3.5a client.
+Place your custom files in the appropriate directories:
+
+- DBFilesClient/       - DBC files (game data tables)
+- Interface/           - UI, icons, and interface assets
+- Fonts/               - Font files
+- Sound/               - Audio files (music, effects, voices)
+- Textures/            - Environment textures, minimaps
+- Character/           - Character models
+- Creature/           - Creature models
+- Item/                - Item models
+- Spells/              - Spell effects and models
+- World/               - Map data (ADT, WDT, WMO files)
+- Cameras/             - Camera files
+
+After placing your files, use:
+  build-mpq package <staging_dir> <output.mpq>
+
+To validate the MPQ:
+  build-mpq validate <output.mpq>
+"""
+
+# Maps Windows separators to "/" in a single str.translate pass
+_NORM_TABLE: Final = str.maketrans("\\", "/")
+
+# Marks trie nodes that complete a valid directory
+_TERMINAL: Final = "$"
+
+
+def _build_trie(directories: tuple[str, ...]) -> dict:
+    """Build a trie of nested dicts keyed on the "/"-separated path components."""
+    trie: dict = {}
+    for directory in directories:
+        node = trie
+        for part in directory.split("/"):
+            node = node.setdefault(part, {})
+        node[_TERMINAL] = True
+    return trie
+
+
+# Precomputed lookup for is_valid_path: a path is checked in O(depth) by
+# walking its leading components instead of comparing it with every directory
+_STRUCTURE_TRIE: Final[dict] = _build_trie(WOW_335_STRUCTURE)
+_TRIE_DEPTH: Final[int] = max(d.count("/") + 1 for d in WOW_335_STRUCTURE)
+
+
+@functools.lru_cache(maxsize=32)
+def _category_trie(categories: frozenset[str]) -> dict:
+    """Return the (cached) trie for the directories of the given categories."""
+    return _build_trie(tuple(get_valid_directories(sorted(categories))))
 
 
 def get_valid_directories(categories: list[str] | None = None) -> list[str]:
@@ -93,35 +177,66 @@ def get_valid_directories(categories: list[str] | None = None) -> list[str]:
                    Valid categories: dbc, interface, fonts, sound, textures, models, world, cameras
 
     Returns:
-        List of directory paths for the specified categories
+        List of directory paths for the specified categories, in the order
+        the categories are given
     """
+    key = None if categories is None else tuple(categories)
+    return list(_valid_dirs_cached(key))
+
+
+@functools.lru_cache(maxsize=64)
+def _valid_dirs_cached(categories: tuple[str, ...] | None) -> tuple[str, ...]:
+    """Compute the directories for get_valid_directories once per category selection."""
     if categories is None:
-        return WOW_335_STRUCTURE.copy()
+        return WOW_335_STRUCTURE
+
+    selected = [_CAT_NAMES.index(c) for c in categories if c in CATEGORIES]
+    return tuple(
+        directory
+        for wanted in selected
+        for directory, cat_id in zip(_CAT_DIRS, _CAT_IDS)
+        if cat_id == wanted
+    )
 
-    result: list[str] = []
-    for category in categories:
-        if category in CATEGORIES:
-            result.extend(CATEGORIES[category])
 
-    return result
+def get_leaf_directories(categories: list[str] | None = None) -> tuple[str, ...]:
+    """Return the valid directories that are not an ancestor of another one.
+
+    Args:
+        categories: Optional list of category names to filter by.
+                   If None, returns the leaves of the whole structure.
+
+    Returns:
+        Sorted tuple of leaf directory paths
+    """
+    if categories is None:
+        return LEAF_DIRS
+    return _compute_leaves(get_valid_directories(categories))
 
 
 def get_available_categories() -> list[str]:
     """Return the list of available category names."""
-    return list(CATEGORIES.keys())
+    return list(_CAT_NAMES)
 
 
-def is_valid_path(path: str) -> bool:
+def is_valid_path(path: str, categories: list[str] | None = None) -> bool:
     """Check if a path starts with a valid WoW 3.3.5a directory.
 
     Args:
         path: Relative path to check (e.g., "Interface/Icons/spell.blp")
+        categories: Optional list of category names to restrict the check to.
+                   If None, any valid directory is accepted.
 
     Returns:
         True if the path starts with a valid WoW directory structure
     """
-    normalized = path.replace("\\", "/")
-    return any(
-        normalized.startswith(valid_dir + "/") or normalized == valid_dir
-        for valid_dir in WOW_335_STRUCTURE
-    )
+    node = _STRUCTURE_TRIE if categories is None else _category_trie(frozenset(categories))
+
+    # Only the leading components can match, so the rest is never split
+    for part in path.translate(_NORM_TABLE).split("/", _TRIE_DEPTH):
+        node = node.get(part)
+        if node is None:
+            return False
+        if _TERMINAL in node:
+            return True
+    return False
@@ -4,117 +4,222 @@ This example shows how to use symbolic links in your staging area during
 development, avoiding the need to copy large asset files.
 """
 
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+import io
+import logging
+import os
+import stat
+import sys
 import tempfile
 
 from build_mpq.operations import create_staging_area, package_mpq
 
+# Shared padding that simulated asset payloads are sliced from
+_FILLER = bytes(8192)
 
-def demo_symlink_workflow():
-    """Demonstrate using symlinks in staging area (development pattern)."""
 
-    print("=== Symlink Development Workflow Demo ===\n")
+def _fast_write(path: Path, parts: list[bytes | memoryview]) -> int:
+    """Write parts to path with one open, one writev and one close.
+
+    Bypasses the buffered file object behind Path.write_bytes and returns
+    the number of bytes written.
+    """
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        return os.writev(fd, parts)
+    finally:
+        os.close(fd)
+
+
+def _batch_setup(directory: Path, assets: dict[str, tuple[bytes, int]]) -> dict[str, int]:
+    """Write each asset into directory and return the number of bytes written per name.
+
+    Each asset is a header followed by that many bytes of padding. The two
+    parts go out in one os.writev, so the payload is never concatenated and
+    no follow-up stat is needed to learn the file's size. The files are
+    independent, so they are written concurrently (os.writev releases the GIL).
+    """
+    filler = memoryview(_FILLER)
+
+    def write(name: str) -> int:
+        header, padding = assets[name]
+        return _fast_write(directory / name, [header, filler[:padding]])
+
+    names = list(assets)
+    with ThreadPoolExecutor(max_workers=max(1, len(names))) as pool:
+        return dict(zip(names, pool.map(write, names)))
+
+
+def _link_all(links: list[tuple[Path, Path]]) -> None:
+    """Create every ``(link, target)`` symlink, resolving each parent directory once.
+
+    Where supported the links are made relative to an O_PATH descriptor for
+    their directory, so the kernel does not walk the full path again for
+    each link placed in it.
+    """
+    if os.symlink not in os.supports_dir_fd:
+        for link, target in links:
+            link.symlink_to(target)
+        return
+
+    by_directory: dict[Path, list[tuple[str, Path]]] = {}
+    for link, target in links:
+        by_directory.setdefault(link.parent, []).append((link.name, target))
+
+    flags = getattr(os, "O_PATH", os.O_RDONLY) | os.O_DIRECTORY
+    for directory, entries in by_directory.items():
+        dir_fd = os.open(directory, flags)
+        try:
+            for name, target in entries:
+                os.symlink(target, name, dir_fd=dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+def _verify(path: Path) -> bool:
+    """Return True if path is a symlink whose target exists."""
+    st = os.lstat(path)
+    if not stat.S_ISLNK(st.st_mode):
+        return False
+    try:
+        os.stat(path)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def _flush(out: io.StringIO, verbose: bool = True) -> None:
+    """Write everything buffered in out to stdout at once (or drop it) and reset the buffer."""
+    if verbose:
+        sys.stdout.write(out.getvalue())
+        sys.stdout.flush()
+    out.seek(0)
+    out.truncate()
+
+
+def demo_symlink_workflow(verbose: bool = True):
+    """Demonstrate using symlinks in staging area (development pattern).
+
+    Args:
+        verbose: If False, run the workflow without printing the walkthrough,
+                 e.g. when timing it or importing it from another script
+    """
+
+    # Buffer the demo's own output and write it out once per step
+    out = io.StringIO()
+    print("=== Symlink Development Workflow Demo ===\n", file=out)
 
     with tempfile.TemporaryDirectory() as tmpdir:
-        tmp_path = Path(tmpdir)
+        tmp_path = Path(tmpdir)  # Already absolute, so paths built from it need no .absolute()
 
         # Step 1: Create your actual asset directory (outside staging)
-        print("Step 1: Creating asset library...")
+        print("Step 1: Creating asset library...", file=out)
         asset_library = tmp_path / "asset_library"
-        asset_library.mkdir()
+        os.mkdir(asset_library)
 
         # Simulate large asset files
+        sizes = _batch_setup(
+            asset_library,
+            {
+                "Spell.dbc": (b"DBC_FILE_", 1000),  # Simulated large file
+                "spell_custom_fireball.blp": (b"BLP_ICON_", 2000),
+                "epic_theme.mp3": (b"MP3_AUDIO_", 5000),
+            },
+        )
         spell_dbc = asset_library / "Spell.dbc"
-        spell_dbc.write_bytes(b"DBC_FILE_" + b"X" * 1000)  # Simulated large file
-
         icon_blp = asset_library / "spell_custom_fireball.blp"
-        icon_blp.write_bytes(b"BLP_ICON_" + b"Y" * 2000)
-
         music_mp3 = asset_library / "epic_theme.mp3"
-        music_mp3.write_bytes(b"MP3_AUDIO_" + b"Z" * 5000)
 
-        print(f"  Created {spell_dbc.name} ({spell_dbc.stat().st_size} bytes)")
-        print(f"  Created {icon_blp.name} ({icon_blp.stat().st_size} bytes)")
-        print(f"  Created {music_mp3.name} ({music_mp3.stat().st_size} bytes)")
-        print()
+        if verbose:
+            for name, size in sizes.items():
+                print(f"  Created {name} ({size} bytes)", file=out)
+        print(file=out)
 
         # Step 2: Create staging area with only needed categories
-        print("Step 2: Creating staging area (dbc, interface, sound only)...")
+        print("Step 2: Creating staging area (dbc, interface, sound only)...", file=out)
         staging = tmp_path / "patch-staging"
+        _flush(out, verbose)
         create_staging_area(staging, categories=["dbc", "interface", "sound"])
-        print()
+        print(file=out)
 
         # Step 3: Create symbolic links instead of copying files
-        print("Step 3: Creating symbolic links to assets...")
+        print("Step 3: Creating symbolic links to assets...", file=out)
 
         dbc_link = staging / "DBFilesClient" / "Spell.dbc"
-        dbc_link.symlink_to(spell_dbc.absolute())
-        print(f"  Linked: {dbc_link.relative_to(staging)} -> {spell_dbc}")
-
         icon_link = staging / "Interface" / "Icons" / "spell_custom_fireball.blp"
-        icon_link.symlink_to(icon_blp.absolute())
-        print(f"  Linked: {icon_link.relative_to(staging)} -> {icon_blp}")
-
         music_link = staging / "Sound" / "Music" / "epic_theme.mp3"
-        music_link.symlink_to(music_mp3.absolute())
-        print(f"  Linked: {music_link.relative_to(staging)} -> {music_mp3}")
-        print()
+        _link_all([(dbc_link, spell_dbc), (icon_link, icon_blp), (music_link, music_mp3)])
+
+        if verbose:
+            print(f"  Linked: DBFilesClient/Spell.dbc -> {spell_dbc}", file=out)
+            print(f"  Linked: Interface/Icons/spell_custom_fireball.blp -> {icon_blp}", file=out)
+            print(f"  Linked: Sound/Music/epic_theme.mp3 -> {music_mp3}", file=out)
+        print(file=out)
 
         # Step 4: Verify links work
-        print("Step 4: Verifying symbolic links...")
-        assert dbc_link.is_symlink() and dbc_link.exists()
-        assert icon_link.is_symlink() and icon_link.exists()
-        assert music_link.is_symlink() and music_link.exists()
-        print("  ✓ All symlinks valid and resolvable")
-        print()
+        print("Step 4: Verifying symbolic links...", file=out)
+        assert _verify(dbc_link)
+        assert _verify(icon_link)
+        assert _verify(music_link)
+        print("  ✓ All symlinks valid and resolvable", file=out)
+        print(file=out)
 
         # Step 5: Package MPQ (symlinks will be resolved)
-        print("Step 5: Packaging MPQ (symlinks will be resolved automatically)...")
+        print("Step 5: Packaging MPQ (symlinks will be resolved automatically)...", file=out)
         output_mpq = tmp_path / "patch-custom-1.MPQ"
 
-        print("\n--- Package Output ---")
+        print("\n--- Package Output ---", file=out)
+        _flush(out, verbose)
         try:
             package_mpq(staging, output_mpq)
-            print("--- End Package Output ---\n")
+            print("--- End Package Output ---\n", file=out)
 
-            if output_mpq.exists():
-                size_kb = output_mpq.stat().st_size / 1024
-                print(f"✓ MPQ created successfully: {output_mpq.name} ({size_kb:.2f} KB)")
-                print(f"  Location: {output_mpq}")
+            try:
+                size_kb = os.stat(output_mpq).st_size / 1024
+            except FileNotFoundError:
+                print("⚠ Note: mpqcli not installed, but workflow demonstrated", file=out)
             else:
-                print("⚠ Note: mpqcli not installed, but workflow demonstrated")
+                print(f"✓ MPQ created successfully: {output_mpq.name} ({size_kb:.2f} KB)", file=out)
+                print(f"  Location: {output_mpq}", file=out)
         except Exception as e:
-            print(f"⚠ mpqcli error (expected if not installed): {e}")
-            print("  The workflow is correct - install mpqcli to actually create MPQs")
-        print()
+            print(f"⚠ mpqcli error (expected if not installed): {e}", file=out)
+            print("  The workflow is correct - install mpqcli to actually create MPQs", file=out)
+        print(file=out)
 
         # Step 6: Show the benefits
-        print("=== Benefits of Symlink Workflow ===")
-        print()
-        print("✓ No file duplication - saves disk space")
-        print("✓ Edit assets in place - changes reflected immediately")
-        print("✓ Easy to manage large asset libraries")
-        print("✓ Multiple staging areas can reference same assets")
-        print("✓ Symlinks are resolved during packaging - MPQ contains real data")
-        print()
-        print("=== Real-World Usage ===")
-        print()
-        print("# Your actual workflow:")
-        print("cd /home/pc/Desktop/acore-custom-staging")
-        print()
-        print("# Create staging for your patch")
-        print("build-mpq create patch-Z --interface --dbc")
-        print()
-        print("# Link your assets (instead of copying)")
-        print("ln -s ~/wow-assets/custom/Spell.dbc patch-Z/DBFilesClient/")
-        print("ln -s ~/wow-assets/custom/icons/*.blp patch-Z/Interface/Icons/")
-        print()
-        print("# Package (symlinks auto-resolved)")
-        print("build-mpq package patch-Z patch-Z.MPQ")
-        print()
-        print("# Validate")
-        print("build-mpq validate patch-Z.MPQ")
+        if not verbose:
+            return
+
+        print("=== Benefits of Symlink Workflow ===", file=out)
+        print(file=out)
+        print("✓ No file duplication - saves disk space", file=out)
+        print("✓ Edit assets in place - changes reflected immediately", file=out)
+        print("✓ Easy to manage large asset libraries", file=out)
+        print("✓ Multiple staging areas can reference same assets", file=out)
+        print("✓ Symlinks are resolved during packaging - MPQ contains real data", file=out)
+        print(file=out)
+        print("=== Real-World Usage ===", file=out)
+        print(file=out)
+        print("# Your actual workflow:", file=out)
+        print("cd /home/pc/Desktop/acore-custom-staging", file=out)
+        print(file=out)
+        print("# Create staging for your patch", file=out)
+        print("build-mpq create patch-Z --interface --dbc", file=out)
+        print(file=out)
+        print("# Link your assets (instead of copying)", file=out)
+        print("ln -s ~/wow-assets/custom/Spell.dbc patch-Z/DBFilesClient/", file=out)
+        print("ln -s ~/wow-assets/custom/icons/*.blp patch-Z/Interface/Icons/", file=out)
+        print(file=out)
+        print("# Package (symlinks auto-resolved)", file=out)
+        print("build-mpq package patch-Z patch-Z.MPQ", file=out)
+        print(file=out)
+        print("# Validate", file=out)
+        print("build-mpq validate patch-Z.MPQ", file=out)
+        _flush(out, verbose)
 
 
 if __name__ == "__main__":
+    # Show build_mpq progress messages, as the build-mpq CLI does
+    logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stdout)
     demo_symlink_workflow()
@@ -3,15 +3,36 @@
 This demonstrates how to use the build_mpq module programmatically.
 """
 
+import logging
+import os
+import shutil
+import sys
 from pathlib import Path
 
 from build_mpq.operations import create_staging_area, package_mpq, validate_mpq
 
 
+def _write_file(path: Path, data: bytes) -> None:
+    """Write data to path on one opened descriptor, resuming after short writes."""
+    flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+    fd = os.open(path, flags, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+
 def main() -> None:
     """Example workflow for creating a custom patch."""
-    # Define paths
-    staging_dir = Path("./example-patch-staging")
+    # Define paths (stage on tmpfs when available, the files are throwaway)
+    shm = Path("/dev/shm")
+    in_memory = shm.is_dir() and os.access(shm, os.W_OK)
+    if in_memory:
+        staging_dir = shm / "example-patch-staging"
+    else:
+        staging_dir = Path("./example-patch-staging")
     output_mpq = Path("./patch-example-1.MPQ")
 
     print("=== WoW 3.3.5a Patch Builder Example ===\n")
@@ -20,21 +41,33 @@ def main() -> None:
     print("Step 1: Creating staging area...")
     try:
         create_staging_area(staging_dir, force=True)
-        print("✓ Staging area created\n")
+        print(f"✓ Staging area created at {staging_dir.absolute()}\n")
     except Exception as e:
         print(f"✗ Failed to create staging area: {e}")
         return
 
+    try:
+        _build(staging_dir, output_mpq)
+    finally:
+        if in_memory:
+            # Do not leave the staging copy taking up RAM
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            print(f"\nRemoved staging area {staging_dir}")
+
+
+def _build(staging_dir: Path, output_mpq: Path) -> None:
+    """Fill the staging area, then package and validate the MPQ."""
+
     # Step 2: Add example files (in a real workflow, you'd copy actual files)
     print("Step 2: Adding example files...")
     example_dbc = staging_dir / "DBFilesClient" / "Example.dbc"
-    example_dbc.write_text("This is example DBC data")
+    _write_file(example_dbc, b"This is example DBC data")
 
     example_icon = staging_dir / "Interface" / "Icons" / "example_spell.blp"
-    example_icon.write_text("This is example icon data")
+    _write_file(example_icon, b"This is example icon data")
 
-    print(f"  Added: {example_dbc.relative_to(staging_dir)}")
-    print(f"  Added: {example_icon.relative_to(staging_dir)}")
+    print("  Added: DBFilesClient/Example.dbc")
+    print("  Added: Interface/Icons/example_spell.blp")
     print("✓ Files added\n")
 
     # Step 3: Package into MPQ
@@ -62,4 +95,6 @@ def main() -> None:
 
 
 if __name__ == "__main__":
+    # Show build_mpq progress messages, as the build-mpq CLI does
+    logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stdout)
     main()
@@ -1,37 +1,90 @@
 """Tests for CLI interface."""
 
+import io
+import logging
+import sys
+from argparse import Namespace
 from unittest.mock import MagicMock, patch
 
 import pytest
 
-from build_mpq.cli import cmd_create, cmd_package, cmd_validate, main
+from build_mpq.cli import _CATEGORY_FLAGS, cmd_create, cmd_package, cmd_validate, main
+from build_mpq.operations import ValidationError
+
+
+@pytest.fixture
+def argv(monkeypatch):
+    """Return a setter that replaces sys.argv for the current test."""
+
+    def _set(args: list[str]) -> None:
+        monkeypatch.setattr(sys, "argv", args)
+
+    return _set
+
+
+@pytest.fixture(autouse=True)
+def restore_build_mpq_logger():
+    """Undo the handler and level main() installs on the build_mpq logger."""
+    logger = logging.getLogger("build_mpq")
+    handlers = list(logger.handlers)
+    level = logger.level
+    yield
+    logger.handlers[:] = handlers
+    logger.setLevel(level)
+
+
+@pytest.fixture(scope="module")
+def create_args() -> Namespace:
+    """Arguments for the create command, shared by the tests in this module."""
+    return Namespace(
+        path="/tmp/staging",
+        force=False,
+        **dict.fromkeys(_CATEGORY_FLAGS, False),
+    )
+
+
+@pytest.fixture(scope="module")
+def package_args() -> Namespace:
+    """Arguments for the package command, shared by the tests in this module."""
+    return Namespace(
+        staging="/tmp/staging",
+        output="/tmp/output.mpq",
+        compression="z",
+        dereference=True,
+        dereference_mode=None,
+    )
+
+
+@pytest.fixture(scope="module")
+def validate_args() -> Namespace:
+    """Arguments for the validate command, shared by the tests in this module."""
+    return Namespace(mpq="/tmp/test.mpq", verbose=False)
 
 
 class TestCLICreate:
     """Tests for the create command."""
 
-    @patch("build_mpq.cli.create_staging_area")
-    def test_cmd_create_success(self, mock_create: MagicMock):
+    def test_cmd_create_success(self, monkeypatch, create_args: Namespace):
         """Test successful create command."""
-        args = MagicMock(path="/tmp/staging", force=False)
+        mock_create = MagicMock()
+        monkeypatch.setattr("build_mpq.cli.create_staging_area", mock_create)
 
-        result = cmd_create(args)
+        result = cmd_create(create_args)
 
         assert result == 0
         mock_create.assert_called_once()
 
-    @patch("build_mpq.cli.create_staging_area")
     def test_cmd_create_handles_file_exists_error(
-        self, mock_create: MagicMock, capsys
+        self, monkeypatch, create_args: Namespace, capfd
     ):
         """Test create command handles FileExistsError."""
-        mock_create.side_effect = FileExistsError("already exists")
-        args = MagicMock(path="/tmp/staging", force=False)
+        mock_create = MagicMock(side_effect=FileExistsError("already exists"))
+        monkeypatch.setattr("build_mpq.cli.create_staging_area", mock_create)
 
-        result = cmd_create(args)
+        result = cmd_create(create_args)
 
         assert result == 1
-        captured = capsys.readouterr()
+        captured = capfd.readouterr()
         assert "already exists" in captured.err
 
 
@@ -39,35 +92,24 @@ class TestCLIPackage:
     """Tests for the package command."""
 
     @patch("build_mpq.cli.package_mpq")
-    def test_cmd_package_success(self, mock_package: MagicMock):
+    def test_cmd_package_success(self, mock_package: MagicMock, package_args: Namespace):
         """Test successful package command."""
-        args = MagicMock(
-            staging="/tmp/staging",
-            output="/tmp/output.mpq",
-            compression="z",
-        )
-
-        result = cmd_package(args)
+        result = cmd_package(package_args)
 
         assert result == 0
         mock_package.assert_called_once()
 
     @patch("build_mpq.cli.package_mpq")
     def test_cmd_package_handles_file_not_found(
-        self, mock_package: MagicMock, capsys
+        self, mock_package: MagicMock, package_args: Namespace, capfd
     ):
         """Test package command handles FileNotFoundError."""
         mock_package.side_effect = FileNotFoundError("not found")
-        args = MagicMock(
-            staging="/tmp/staging",
-            output="/tmp/output.mpq",
-            compression="z",
-        )
 
-        result = cmd_package(args)
+        result = cmd_package(package_args)
 
         assert result == 1
-        captured = capsys.readouterr()
+        captured = capfd.readouterr()
         assert "not found" in captured.err
 
 
@@ -75,80 +117,122 @@ class TestCLIValidate:
     """Tests for the validate command."""
 
     @patch("build_mpq.cli.validate_mpq")
-    def test_cmd_validate_success(self, mock_validate: MagicMock):
+    def test_cmd_validate_success(self, mock_validate: MagicMock, validate_args: Namespace):
         """Test successful validate command."""
-        args = MagicMock(mpq="/tmp/test.mpq", verbose=False)
-
-        result = cmd_validate(args)
+        result = cmd_validate(validate_args)
 
         assert result == 0
         mock_validate.assert_called_once()
 
     @patch("build_mpq.cli.validate_mpq")
     def test_cmd_validate_handles_validation_error(
-        self, mock_validate: MagicMock, capsys
+        self, mock_validate: MagicMock, validate_args: Namespace, capfd
     ):
         """Test validate command handles ValidationError."""
-        from build_mpq.operations import ValidationError
-
         mock_validate.side_effect = ValidationError("invalid")
-        args = MagicMock(mpq="/tmp/test.mpq", verbose=False)
 
-        result = cmd_validate(args)
+        result = cmd_validate(validate_args)
 
         assert result == 1
-        captured = capsys.readouterr()
+        captured = capfd.readouterr()
         assert "Validation failed" in captured.err
 
 
 class TestMainCLI:
     """Tests for main CLI entry point."""
 
-    def test_main_requires_command(self):
+    def test_main_requires_command(self, argv):
         """Test that main requires a command."""
-        with patch("sys.argv", ["build-mpq"]):
-            with pytest.raises(SystemExit):
-                main()
+        argv(["build-mpq"])
 
-    @patch("sys.argv", ["build-mpq", "--version"])
-    def test_main_version(self):
+        with pytest.raises(SystemExit):
+            main()
+
+    def test_main_version(self, argv):
         """Test --version flag."""
+        argv(["build-mpq", "--version"])
+
         with pytest.raises(SystemExit) as exc_info:
             main()
 
         assert exc_info.value.code == 0
 
-    @patch("sys.argv", ["build-mpq", "create", "--help"])
-    def test_main_create_help(self):
+    def test_main_create_help(self, argv):
         """Test create --help."""
+        argv(["build-mpq", "create", "--help"])
+
         with pytest.raises(SystemExit) as exc_info:
             main()
 
         assert exc_info.value.code == 0
 
     @patch("build_mpq.cli.create_staging_area")
-    @patch("sys.argv", ["build-mpq", "create", "/tmp/staging"])
-    def test_main_create_command(self, mock_create: MagicMock):
+    def test_main_create_command(self, mock_create: MagicMock, argv):
         """Test running create command through main."""
+        argv(["build-mpq", "create", "/tmp/staging"])
+
         result = main()
 
         assert result == 0
         mock_create.assert_called_once()
 
+    @patch("build_mpq.cli.create_staging_area")
+    def test_main_create_passes_selected_categories(self, mock_create: MagicMock, argv):
+        """Test that category flags are passed on in canonical order."""
+        argv(["build-mpq", "create", "/tmp/staging", "--sound", "--dbc"])
+
+        result = main()
+
+        assert result == 0
+        assert mock_create.call_args.kwargs["categories"] == ["dbc", "sound"]
+
+    @patch("build_mpq.cli.create_staging_area")
+    def test_main_create_without_flags_uses_all_categories(self, mock_create: MagicMock, argv):
+        """Test that no category flags means all categories."""
+        argv(["build-mpq", "create", "/tmp/staging"])
+
+        main()
+
+        assert mock_create.call_args.kwargs["categories"] is None
+
     @patch("build_mpq.cli.package_mpq")
-    @patch("sys.argv", ["build-mpq", "package", "/tmp/staging", "/tmp/out.mpq"])
-    def test_main_package_command(self, mock_package: MagicMock):
+    def test_main_package_command(self, mock_package: MagicMock, argv):
         """Test running package command through main."""
+        argv(["build-mpq", "package", "/tmp/staging", "/tmp/out.mpq"])
+
         result = main()
 
         assert result == 0
         mock_package.assert_called_once()
 
     @patch("build_mpq.cli.validate_mpq")
-    @patch("sys.argv", ["build-mpq", "validate", "/tmp/test.mpq"])
-    def test_main_validate_command(self, mock_validate: MagicMock):
+    def test_main_validate_command(self, mock_validate: MagicMock, argv):
         """Test running validate command through main."""
+        argv(["build-mpq", "validate", "/tmp/test.mpq"])
+
         result = main()
 
         assert result == 0
         mock_validate.assert_called_once()
+
+    def test_main_prints_progress_to_stdout(self, tmp_path, capsys, argv):
+        """Test that operation progress messages reach stdout through main."""
+        staging = tmp_path / "staging"
+        argv(["build-mpq", "create", str(staging), "--dbc"])
+
+        result = main()
+
+        assert result == 0
+        captured = capsys.readouterr()
+        assert "Creating staging area" in captured.out
+
+    def test_progress_follows_replaced_stdout(self, tmp_path, monkeypatch, argv):
+        """Test that the progress handler writes to the current sys.stdout."""
+        argv(["build-mpq", "create", str(tmp_path / "staging"), "--dbc"])
+        main()
+
+        replacement = io.StringIO()
+        monkeypatch.setattr(sys, "stdout", replacement)
+        logging.getLogger("build_mpq").info("after swap")
+
+        assert "after swap" in replacement.getvalue()
@@ -3,18 +3,28 @@
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
+import asyncio
+import io
+import logging
+import os
+import shutil
 import subprocess
 import errno
 
 import pytest
 
+from build_mpq import operations
 from build_mpq.operations import (
     MPQCliNotFoundError,
+    MPQError,
     ValidationError,
     create_staging_area,
     package_mpq,
+    package_mpq_async,
+    reset_mpqcli_cache,
     validate_mpq,
 )
+from build_mpq.structure import WOW_335_STRUCTURE
 
 
 @pytest.fixture
@@ -24,10 +34,20 @@ def temp_staging(tmp_path: Path) -> Path:
     return staging
 
 
+@pytest.fixture(scope="session")
+def _staging_skeleton(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    """Create an empty staging area once per session, to be copied by tests."""
+    skeleton = tmp_path_factory.mktemp("skeleton") / "staging"
+    create_staging_area(skeleton)
+    return skeleton
+
+
 @pytest.fixture
-def populated_staging(temp_staging: Path) -> Path:
+def populated_staging(temp_staging: Path, _staging_skeleton: Path) -> Path:
     """Create a staging area with some test files."""
-    create_staging_area(temp_staging)
+    # Hardlink the shared skeleton; create_staging_area(force=True) unlinks
+    # before rewriting, so tests never modify the skeleton's files
+    shutil.copytree(_staging_skeleton, temp_staging, copy_function=os.link)
 
     # Add some test files
     (temp_staging / "DBFilesClient" / "test.dbc").write_text("test data")
@@ -36,6 +56,36 @@ def populated_staging(temp_staging: Path) -> Path:
     return temp_staging
 
 
+class FakeRunner:
+    """In-process stand-in for subprocess.run that records every call."""
+
+    def __init__(self, side_effect=None):
+        self.calls: list[tuple[tuple, dict]] = []
+        self.side_effect = side_effect
+
+    def __call__(self, *args, **kwargs):
+        self.calls.append((args, kwargs))
+        if self.side_effect is not None:
+            return self.side_effect(*args, **kwargs)
+        return subprocess.CompletedProcess(args[0], 0, "", "")
+
+
+@pytest.fixture(autouse=True)
+def reset_mpqcli_lookup():
+    """Forget any mpqcli path cached by a previous test."""
+    reset_mpqcli_cache()
+    yield
+    reset_mpqcli_cache()
+
+
+def mock_mpqcli_list(mock_popen: MagicMock, stdout: str, returncode: int = 0) -> None:
+    """Make a patched subprocess.Popen behave like `mpqcli list` printing stdout."""
+    proc = MagicMock()
+    proc.stdout = io.BytesIO(stdout.encode("utf-8"))
+    proc.returncode = returncode
+    mock_popen.return_value.__enter__.return_value = proc
+
+
 class TestCreateStagingArea:
     """Tests for create_staging_area function."""
 
@@ -52,6 +102,13 @@ class TestCreateStagingArea:
         assert (temp_staging / "Sound" / "Music").exists()
         assert (temp_staging / "World" / "Maps").exists()
 
+    def test_creates_every_structure_directory(self, temp_staging: Path):
+        """Test that each directory in the canonical structure is created."""
+        create_staging_area(temp_staging)
+
+        for directory in WOW_335_STRUCTURE:
+            assert (temp_staging / directory).is_dir(), directory
+
     def test_creates_readme(self, temp_staging: Path):
         """Test that README.txt is created."""
         create_staging_area(temp_staging)
@@ -64,6 +121,21 @@ class TestCreateStagingArea:
         assert "WoW 3.3.5a" in content
         assert "DBFilesClient" in content
 
+    def test_readme_survives_short_writev(self, temp_staging: Path):
+        """A writev that stops mid-chunk should resume where it left off."""
+        real_writev = os.writev
+
+        def short_writev(fd, buffers):
+            return real_writev(fd, [bytes(buffers[0])[:7]])
+
+        with patch("build_mpq.operations.os.writev", side_effect=short_writev):
+            create_staging_area(temp_staging, categories=["dbc"])
+
+        content = (temp_staging / "README.txt").read_bytes()
+        assert content.startswith(operations.README_HEADER_BYTES)
+        assert content.endswith(operations.README_FOOTER_BYTES)
+        assert b"Created categories: dbc\n" in content
+
     def test_raises_error_if_exists_without_force(self, temp_staging: Path):
         """Test that FileExistsError is raised if staging exists."""
         create_staging_area(temp_staging)
@@ -153,10 +225,8 @@ class TestPackageMPQ:
             package_mpq(populated_staging, output)
 
     @patch("shutil.which")
-    @patch("subprocess.run")
     def test_calls_mpqcli_with_correct_arguments(
         self,
-        mock_run: MagicMock,
         mock_which: MagicMock,
         populated_staging: Path,
         tmp_path: Path,
@@ -166,19 +236,17 @@ class TestPackageMPQ:
 
         output = tmp_path / "output.mpq"
 
-        # Mock subprocess to create the file as a side effect
+        # Fake mpqcli run that creates the file as a side effect
         def create_output_file(*args, **kwargs):
             output.write_bytes(b"fake mpq data")
             return MagicMock(returncode=0, stdout="", stderr="")
 
-        mock_run.side_effect = create_output_file
+        runner = FakeRunner(create_output_file)
 
-        package_mpq(populated_staging, output, compression="z")
+        package_mpq(populated_staging, output, compression="z", runner=runner)
 
-        mock_run.assert_called_once()
-        call_args = mock_run.call_args
-
-        cmd_args = call_args[0][0]
+        assert len(runner.calls) == 1
+        cmd_args = runner.calls[-1][0][0]
         assert cmd_args[0] == "mpqcli"
         assert cmd_args[1] == "create"
         # Should use --output and pass the staging dir as the target ('.')
@@ -188,10 +256,67 @@ class TestPackageMPQ:
         assert "--compression" not in cmd_args
 
     @patch("shutil.which")
-    @patch("subprocess.run")
+    @pytest.mark.parametrize("relative", ["out/patch.mpq", "sub/../out/patch.mpq"])
+    def test_relative_output_path_is_made_absolute(
+        self,
+        mock_which: MagicMock,
+        populated_staging: Path,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+        relative: str,
+    ):
+        """A relative output path is passed to mpqcli relative to the caller's cwd."""
+        mock_which.return_value = "/usr/bin/mpqcli"
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "sub").mkdir()
+        # Like Path.absolute(), ".." is left for the OS to resolve
+        expected = str(tmp_path / relative)
+
+        def create_output_file(*args, **kwargs):
+            Path(expected).write_bytes(b"fake mpq data")
+            return MagicMock(returncode=0, stdout="", stderr="")
+
+        runner = FakeRunner(create_output_file)
+        package_mpq(populated_staging, Path(relative), runner=runner)
+
+        assert runner.calls[-1][0][0][3] == expected
+        assert (tmp_path / "out").is_dir()
+
+    @pytest.mark.parametrize("fast_spawn", [True, False])
+    @patch("shutil.which")
+    def test_mpqcli_spawn_options(
+        self,
+        mock_which: MagicMock,
+        fast_spawn: bool,
+        populated_staging: Path,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        """Fast spawn keeps inherited fds and passes only the allowlisted environment."""
+        mock_which.return_value = "/usr/bin/mpqcli"
+        monkeypatch.setattr(operations, "_FAST_SPAWN", fast_spawn)
+        monkeypatch.setenv("BUILD_MPQ_SECRET", "not for mpqcli")
+        output = tmp_path / "output.mpq"
+
+        def create_output_file(*args, **kwargs):
+            output.write_bytes(b"fake mpq data")
+            return MagicMock(returncode=0, stdout="", stderr="")
+
+        runner = FakeRunner(create_output_file)
+        package_mpq(populated_staging, output, runner=runner)
+
+        kwargs = runner.calls[-1][1]
+        if fast_spawn:
+            assert kwargs["close_fds"] is False
+            assert kwargs["env"]["PATH"] == os.environ["PATH"]
+            assert "BUILD_MPQ_SECRET" not in kwargs["env"]
+        else:
+            assert "close_fds" not in kwargs
+            assert "env" not in kwargs
+
+    @patch("shutil.which")
     def test_handles_symbolic_links(
         self,
-        mock_run: MagicMock,
         mock_which: MagicMock,
         temp_staging: Path,
         real_asset_files: Path,
@@ -212,7 +337,7 @@ class TestPackageMPQ:
 
         output = tmp_path / "output.mpq"
 
-        # Mock subprocess
+        # Fake mpqcli run
         def create_output_file(*args, **kwargs):
             # Ensure we invoke mpqcli with the staging dir target ('.') and not absolute asset paths
             cmd_args = args[0]
@@ -235,17 +360,15 @@ class TestPackageMPQ:
             output.write_bytes(b"fake mpq data")
             return MagicMock(returncode=0, stdout="", stderr="")
 
-        mock_run.side_effect = create_output_file
+        runner = FakeRunner(create_output_file)
 
-        package_mpq(temp_staging, output)
+        package_mpq(temp_staging, output, runner=runner)
 
-        mock_run.assert_called_once()
+        assert len(runner.calls) == 1
 
     @patch("shutil.which")
-    @patch("subprocess.run")
     def test_dereference_symlinks_creates_temp_copy(
         self,
-        mock_run: MagicMock,
         mock_which: MagicMock,
         temp_staging: Path,
         real_asset_files: Path,
@@ -288,12 +411,381 @@ class TestPackageMPQ:
             output.write_bytes(b"fake mpq data")
             return MagicMock(returncode=0, stdout="", stderr="")
 
+        runner = FakeRunner(create_output_file)
+
+        package_mpq(temp_staging, output, dereference_symlinks=True, runner=runner)
+
+        assert len(runner.calls) == 1
+
+    @pytest.mark.parametrize("dereference_mode", ["always", "never"])
+    @patch("shutil.which")
+    def test_archive_contents_do_not_depend_on_symlinks(
+        self,
+        mock_which: MagicMock,
+        dereference_mode: str,
+        populated_staging: Path,
+        tmp_path: Path,
+    ):
+        """The same tree packs the same files whether or not it holds a symlink."""
+        mock_which.return_value = "/usr/bin/mpqcli"
+        output = tmp_path / "output.mpq"
+
+        def pack() -> set[str]:
+            """Run package_mpq and return what mpqcli would list from its cwd."""
+            packed: set[str] = set()
+
+            def list_cwd(*args, **kwargs):
+                cwd = kwargs["cwd"]
+                for root, _, names in os.walk(cwd):
+                    packed.update(
+                        os.path.relpath(os.path.join(root, n), cwd).replace(os.sep, "/")
+                        for n in names
+                    )
+                output.write_bytes(b"fake mpq data")
+                return subprocess.CompletedProcess(args[0], 0, "", "")
+
+            package_mpq(
+                populated_staging,
+                output,
+                dereference_mode=dereference_mode,
+                runner=FakeRunner(list_cwd),
+            )
+            return packed
+
+        without_link = pack()
+        (populated_staging / "DBFilesClient" / "link.dbc").symlink_to("test.dbc")
+        with_link = pack()
+
+        assert "README.txt" in without_link
+        assert with_link - {"DBFilesClient/link.dbc"} == without_link
+
+    @patch("shutil.which")
+    @patch("subprocess.run")
+    def test_dereference_copies_large_tree(
+        self,
+        mock_run: MagicMock,
+        mock_which: MagicMock,
+        temp_staging: Path,
+        real_asset_files: Path,
+        tmp_path: Path,
+    ):
+        """Trees large enough to be copied in parallel should be fully materialized."""
+        mock_which.return_value = "/usr/bin/mpqcli"
+
+        create_staging_area(temp_staging)
+
+        icons = temp_staging / "Interface" / "Icons"
+        for i in range(300):
+            (icons / f"icon_{i:03d}.blp").write_bytes(f"icon {i}".encode())
+        (temp_staging / "DBFilesClient" / "Spell.dbc").symlink_to(real_asset_files / "spell.dbc")
+
+        output = tmp_path / "output.mpq"
+
+        def create_output_file(*args, **kwargs):
+            cwd = Path(kwargs.get("cwd"))
+            copied_icons = sorted((cwd / "Interface" / "Icons").iterdir())
+            assert len(copied_icons) == 300
+            assert (cwd / "Interface" / "Icons" / "icon_123.blp").read_bytes() == b"icon 123"
+            copied_dbc = cwd / "DBFilesClient" / "Spell.dbc"
+            assert not copied_dbc.is_symlink()
+            assert copied_dbc.read_bytes() == b"DBC_FILE_DATA_12345"
+
+            output.write_bytes(b"fake mpq data")
+            return MagicMock(returncode=0, stdout="", stderr="")
+
         mock_run.side_effect = create_output_file
 
         package_mpq(temp_staging, output, dereference_symlinks=True)
 
         mock_run.assert_called_once()
 
+    @patch("shutil.which")
+    @patch("subprocess.run")
+    def test_dereference_copy_is_created_next_to_staging(
+        self,
+        mock_run: MagicMock,
+        mock_which: MagicMock,
+        populated_staging: Path,
+        tmp_path: Path,
+    ):
+        """The dereferenced copy should live beside the staging area and be removed afterwards."""
+        mock_which.return_value = "/usr/bin/mpqcli"
+
+        (populated_staging / "DBFilesClient" / "link.dbc").symlink_to("test.dbc")
+        output = tmp_path / "output.mpq"
+
+        def create_output_file(*args, **kwargs):
+            cwd = Path(kwargs.get("cwd"))
+            assert cwd.parent.parent == populated_staging.parent
+            assert cwd.parent.name.startswith(".build_mpq_")
+            output.write_bytes(b"fake mpq data")
+            return MagicMock(returncode=0, stdout="", stderr="")
+
+        mock_run.side_effect = create_output_file
+
+        package_mpq(populated_staging, output, dereference_symlinks=True)
+
+        mock_run.assert_called_once()
+        assert not list(populated_staging.parent.glob(".build_mpq_*"))
+
+    @patch("shutil.which")
+    @patch("subprocess.run")
+    def test_symlink_free_staging_skips_dereference_copy(
+        self,
+        mock_run: MagicMock,
+        mock_which: MagicMock,
+        populated_staging: Path,
+        tmp_path: Path,
+        caplog: pytest.LogCaptureFixture,
+    ):
+        """Without any symlinks, mpqcli should run directly in the staging area."""
+        mock_which.return_value = "/usr/bin/mpqcli"
+        caplog.set_level(logging.INFO, logger="build_mpq")
+
+        output = tmp_path / "output.mpq"
+
+        def create_output_file(*args, **kwargs):
+            assert kwargs.get("cwd") == populated_staging
+            output.write_bytes(b"fake mpq data")
+            return MagicMock(returncode=0, stdout="", stderr="")
+
+        mock_run.side_effect = create_output_file
+
+        package_mpq(populated_staging, output, dereference_symlinks=True)
+
+        mock_run.assert_called_once()
+        assert not list(populated_staging.parent.glob(".build_mpq_*"))
+        assert "Packaging 2 file(s): 2 regular, 0 symlinked" in caplog.text
+
+    @patch("build_mpq.operations._mpqcli_follows_symlinks")
+    @patch("shutil.which")
+    @patch("subprocess.run")
+    def test_auto_dereference_skips_copy_when_mpqcli_follows_symlinks(
+        self,
+        mock_run: MagicMock,
+        mock_which: MagicMock,
+        mock_follows: MagicMock,
+        temp_staging: Path,
+        real_asset_files: Path,
+        tmp_path: Path,
+    ):
+        """In auto mode, mpqcli should run on the staging area directly if it follows symlinks."""
+        mock_which.return_value = "/usr/bin/mpqcli"
+        mock_follows.return_value = True
+
+        create_staging_area(temp_staging)
+        (temp_staging / "DBFilesClient" / "Spell.dbc").symlink_to(real_asset_files / "spell.dbc")
+
+        output = tmp_path / "output.mpq"
+
+        def create_output_file(*args, **kwargs):
+            assert Path(kwargs.get("cwd")) == temp_staging
+            output.write_bytes(b"fake mpq data")
+            return MagicMock(returncode=0, stdout="", stderr="")
+
+        mock_run.side_effect = create_output_file
+
+        package_mpq(temp_staging, output, dereference_mode="auto")
+
+        mock_follows.assert_called_once_with("/usr/bin/mpqcli", runner=None)
+        mock_run.assert_called_once()
+
+    @patch("build_mpq.operations._mpqcli_follows_symlinks")
+    @patch("shutil.which")
+    @patch("subprocess.run")
+    def test_auto_dereference_copies_when_mpqcli_stores_links(
+        self,
+        mock_run: MagicMock,
+        mock_which: MagicMock,
+        mock_follows: MagicMock,
+        temp_staging: Path,
+        real_asset_files: Path,
+        tmp_path: Path,
+    ):
+        """In auto mode, the dereferenced copy is kept if mpqcli does not follow symlinks."""
+        mock_which.return_value = "/usr/bin/mpqcli"
+        mock_follows.return_value = False
+
+        create_staging_area(temp_staging)
+        (temp_staging / "DBFilesClient" / "Spell.dbc").symlink_to(real_asset_files / "spell.dbc")
+
+        output = tmp_path / "output.mpq"
+
+        def create_output_file(*args, **kwargs):
+            cwd = Path(kwargs.get("cwd"))
+            assert cwd != temp_staging
+            assert not (cwd / "DBFilesClient" / "Spell.dbc").is_symlink()
+            output.write_bytes(b"fake mpq data")
+            return MagicMock(returncode=0, stdout="", stderr="")
+
+        mock_run.side_effect = create_output_file
+
+        package_mpq(temp_staging, output, dereference_mode="auto")
+
+        mock_run.assert_called_once()
+
+    @patch("build_mpq.operations._mpqcli_follows_symlinks")
+    @patch("shutil.which")
+    def test_auto_dereference_copies_when_links_are_broken(
+        self,
+        mock_which: MagicMock,
+        mock_follows: MagicMock,
+        temp_staging: Path,
+        real_asset_files: Path,
+        tmp_path: Path,
+        caplog: pytest.LogCaptureFixture,
+    ):
+        """Broken links should not reach mpqcli in auto mode, even if it follows valid ones."""
+        caplog.set_level(logging.INFO, logger="build_mpq")
+        mock_which.return_value = "/usr/bin/mpqcli"
+        mock_follows.return_value = True
+
+        create_staging_area(temp_staging)
+        (temp_staging / "DBFilesClient" / "Spell.dbc").symlink_to(real_asset_files / "spell.dbc")
+        (temp_staging / "DBFilesClient" / "Broken.dbc").symlink_to(tmp_path / "missing.dbc")
+
+        output = tmp_path / "output.mpq"
+
+        def create_output_file(cmd, **kwargs):
+            cwd = Path(kwargs["cwd"])
+            assert cwd != temp_staging
+            assert (cwd / "DBFilesClient" / "Spell.dbc").read_bytes() == b"DBC_FILE_DATA_12345"
+            assert not os.path.lexists(cwd / "DBFilesClient" / "Broken.dbc")
+            output.write_bytes(b"fake mpq data")
+            return subprocess.CompletedProcess(cmd, 0, "", "")
+
+        runner = FakeRunner(create_output_file)
+        package_mpq(temp_staging, output, dereference_mode="auto", runner=runner)
+
+        assert len(runner.calls) == 1
+        assert "These files will be skipped in the MPQ." in caplog.text
+        assert "Packaging 1 file(s): 0 regular, 1 symlinked" in caplog.text
+
+    @patch("shutil.which")
+    def test_broken_links_without_copy_are_not_reported_as_skipped(
+        self,
+        mock_which: MagicMock,
+        temp_staging: Path,
+        tmp_path: Path,
+        caplog: pytest.LogCaptureFixture,
+    ):
+        """Without the copy, the report should say broken links go to mpqcli as they are."""
+        mock_which.return_value = "/usr/bin/mpqcli"
+
+        create_staging_area(temp_staging)
+        (temp_staging / "DBFilesClient" / "Broken.dbc").symlink_to(tmp_path / "missing.dbc")
+
+        output = tmp_path / "output.mpq"
+
+        def create_output_file(cmd, **kwargs):
+            assert Path(kwargs["cwd"]) == temp_staging
+            output.write_bytes(b"fake mpq data")
+            return subprocess.CompletedProcess(cmd, 0, "", "")
+
+        package_mpq(
+            temp_staging, output, dereference_mode="never", runner=FakeRunner(create_output_file)
+        )
+
+        assert "These links are passed to mpqcli unchanged." in caplog.text
+        assert "will be skipped" not in caplog.text
+
+    def test_raises_on_invalid_dereference_mode(self, populated_staging: Path, tmp_path: Path):
+        """Test that an unknown dereference mode raises ValueError."""
+        with pytest.raises(ValueError, match="Invalid dereference mode"):
+            package_mpq(populated_staging, tmp_path / "output.mpq", dereference_mode="sometimes")
+
+    @pytest.mark.parametrize("use_statx", [True, False])
+    def test_symlink_target_check(
+        self,
+        monkeypatch: pytest.MonkeyPatch,
+        real_asset_files: Path,
+        tmp_path: Path,
+        use_statx: bool,
+    ):
+        """Symlinks are classified the same with statx and with the os.stat lookup."""
+        if use_statx and operations._libc_statx() is None:
+            pytest.skip("statx is not available")
+        monkeypatch.setattr(operations, "_STATX_DONT_SYNC", use_statx)
+
+        good = tmp_path / "good.dbc"
+        good.symlink_to(real_asset_files / "spell.dbc")
+        missing = tmp_path / "missing.dbc"
+        missing.symlink_to(tmp_path / "nowhere.dbc")
+        directory = tmp_path / "dir_link"
+        directory.symlink_to(real_asset_files)
+        cyclic = tmp_path / "loop.dbc"
+        cyclic.symlink_to(cyclic)
+
+        entries = {entry.name: entry for entry in os.scandir(tmp_path)}
+        assert not operations._is_broken_symlink(entries["good.dbc"])
+        assert operations._is_broken_symlink(entries["missing.dbc"])
+        assert operations._is_broken_symlink(entries["dir_link"])
+        assert operations._is_broken_symlink(entries["loop.dbc"])
+
+    @pytest.mark.parametrize("silent", [False, True])
+    @pytest.mark.parametrize("sendfile_works", [True, False])
+    def test_copy_fallback_without_copy_file_range(
+        self,
+        monkeypatch: pytest.MonkeyPatch,
+        real_asset_files: Path,
+        tmp_path: Path,
+        sendfile_works: bool,
+        silent: bool,
+    ):
+        """Copies should still succeed when the in-kernel copy calls are unavailable.
+
+        silent covers calls that copy 0 bytes at offset 0 instead of failing.
+        """
+        def unsupported(*args, **kwargs):
+            if silent:
+                return 0
+            raise OSError(errno.EXDEV, "Cross-device copy")
+
+        monkeypatch.setattr(os, "copy_file_range", unsupported, raising=False)
+        if not sendfile_works:
+            monkeypatch.setattr(os, "sendfile", unsupported, raising=False)
+
+        payload = b"MPQ" * 500_000
+        src = real_asset_files / "large.blp"
+        src.write_bytes(payload)
+        dst = tmp_path / "copy.blp"
+
+        operations._copy_file(src, str(dst))
+
+        assert dst.read_bytes() == payload
+
+    def test_clone_all_links_plan_and_copies_leftovers(self, tmp_path: Path):
+        """Without clone support every pair is hardlinked; unlinkable ones are copied."""
+        src_dir = tmp_path / "src"
+        dst_dir = tmp_path / "dst"
+        src_dir.mkdir()
+        dst_dir.mkdir()
+        jobs = []
+        for i in range(4):
+            (src_dir / f"{i}.blp").write_bytes(b"asset %d" % i)
+            jobs.append((str(src_dir / f"{i}.blp"), str(dst_dir / f"{i}.blp")))
+
+        real_link = os.link
+
+        def link(src, dst):
+            if src.endswith("2.blp"):
+                raise OSError(errno.EXDEV, "Cross-device link")
+            real_link(src, dst)
+
+        def no_reflink(src, dst, caps):
+            caps["reflink"] = False
+            return False
+
+        with patch.object(operations, "_reflink", side_effect=no_reflink), patch(
+            "os.link", side_effect=link
+        ):
+            operations._clone_all(jobs, {"reflink": True})
+
+        for i, (src, dst) in enumerate(jobs):
+            assert Path(dst).read_bytes() == b"asset %d" % i
+            assert os.path.samefile(src, dst) == (i != 2)
+
+    @patch.object(operations, "_reflink", return_value=False)
     @patch("os.link")
     @patch("shutil.which")
     @patch("subprocess.run")
@@ -302,6 +794,7 @@ class TestPackageMPQ:
         mock_run: MagicMock,
         mock_which: MagicMock,
         mock_link: MagicMock,
+        mock_reflink: MagicMock,
         temp_staging: Path,
         real_asset_files: Path,
         tmp_path: Path,
@@ -309,7 +802,8 @@ class TestPackageMPQ:
         """If hardlink creation fails with EXDEV, fallback to copying should occur."""
         mock_which.return_value = "/usr/bin/mpqcli"
 
-        # Simulate os.link raising EXDEV
+        # Simulate os.link raising EXDEV (clones are patched out above so a
+        # reflink-capable filesystem cannot skip the hardlink attempt)
         mock_link.side_effect = OSError(errno.EXDEV, "Cross-device link")
 
         # Create staging area
@@ -337,6 +831,8 @@ class TestPackageMPQ:
         package_mpq(temp_staging, output, dereference_symlinks=True)
 
         mock_run.assert_called_once()
+        # Clones are disabled, so the copy must come from the EXDEV fallback
+        assert mock_link.called
 
     @patch("shutil.which")
     @patch("subprocess.run")
@@ -346,9 +842,10 @@ class TestPackageMPQ:
         mock_which: MagicMock,
         temp_staging: Path,
         tmp_path: Path,
-        capsys,
+        caplog,
     ):
         """Test that broken symbolic links are detected and skipped."""
+        caplog.set_level(logging.INFO, logger="build_mpq")
         mock_which.return_value = "/usr/bin/mpqcli"
 
         # Create staging area
@@ -375,8 +872,7 @@ class TestPackageMPQ:
         package_mpq(temp_staging, output)
 
         # Check output mentions broken symlink (skipped)
-        captured = capsys.readouterr()
-        out = captured.out.lower()
+        out = caplog.text.lower()
         assert "skipping broken symlink" in out or "broken symbolic link" in out
         assert "skip" in out
 
@@ -384,6 +880,77 @@ class TestPackageMPQ:
         call_args = mock_run.call_args[0][0]
         assert "." in call_args
 
+    @patch("shutil.which")
+    @patch("subprocess.run")
+    def test_broken_symlink_report_is_bounded(
+        self,
+        mock_run: MagicMock,
+        mock_which: MagicMock,
+        temp_staging: Path,
+        tmp_path: Path,
+        caplog,
+    ):
+        """Only a bounded number of broken symlinks should be listed individually."""
+        caplog.set_level(logging.INFO, logger="build_mpq")
+        mock_which.return_value = "/usr/bin/mpqcli"
+
+        create_staging_area(temp_staging)
+
+        nonexistent = tmp_path / "nonexistent" / "file.dbc"
+        for i in range(25):
+            (temp_staging / "DBFilesClient" / f"Broken{i:02d}.dbc").symlink_to(nonexistent)
+
+        output = tmp_path / "output.mpq"
+
+        def create_output_file(*args, **kwargs):
+            output.write_bytes(b"fake mpq data")
+            return MagicMock(returncode=0, stdout="", stderr="")
+
+        mock_run.side_effect = create_output_file
+
+        package_mpq(temp_staging, output, dereference_symlinks=False)
+
+        out = caplog.text
+        assert "25 broken symbolic link(s) detected" in out
+        assert out.count("(target not found)") == 20
+        assert "... and 5 more" in out
+        # The whole report is emitted as one record rather than one per link
+        assert sum("(target not found)" in r.getMessage() for r in caplog.records) == 1
+
+    @patch("shutil.which")
+    @patch("subprocess.run")
+    def test_reports_symlink_to_directory_as_non_file(
+        self,
+        mock_run: MagicMock,
+        mock_which: MagicMock,
+        temp_staging: Path,
+        tmp_path: Path,
+        caplog,
+    ):
+        """A symlink to a directory is skipped and reported as not a regular file."""
+        caplog.set_level(logging.INFO, logger="build_mpq")
+        mock_which.return_value = "/usr/bin/mpqcli"
+
+        create_staging_area(temp_staging)
+        target_dir = tmp_path / "some_dir"
+        target_dir.mkdir()
+        (temp_staging / "DBFilesClient" / "DirLink.dbc").symlink_to(target_dir)
+
+        output = tmp_path / "output.mpq"
+
+        def create_output_file(*args, **kwargs):
+            cwd = Path(kwargs.get("cwd"))
+            assert not (cwd / "DBFilesClient" / "DirLink.dbc").exists()
+            output.write_bytes(b"fake mpq data")
+            return MagicMock(returncode=0, stdout="", stderr="")
+
+        mock_run.side_effect = create_output_file
+
+        package_mpq(temp_staging, output)
+
+        assert "DirLink.dbc" in caplog.text
+        assert "(not a regular file)" in caplog.text
+
     @patch("shutil.which")
     @patch("subprocess.run")
     def test_includes_command_and_stderr_on_mpqcli_failure(
@@ -515,6 +1082,181 @@ class TestPackageMPQ:
         with pytest.raises(IsADirectoryError):
             package_mpq(temp_staging, output_dir)
 
+    @pytest.fixture
+    def fake_mpqcli(self, tmp_path: Path) -> str:
+        """Write an executable stand-in for mpqcli that creates its --output file."""
+        script = tmp_path / "bin" / "mpqcli"
+        script.parent.mkdir()
+        script.write_text(
+            '#!/bin/sh\n'
+            'if [ -f FAIL ]; then echo "archive error" >&2; exit 2; fi\n'
+            'printf "fake mpq" > "$3"\n'
+            'echo "Created $3"\n'
+        )
+        script.chmod(0o755)
+        return str(script)
+
+    @pytest.mark.skipif(os.name == "nt", reason="fake mpqcli is a shell script")
+    @patch("shutil.which")
+    def test_package_async_runs_concurrently(
+        self,
+        mock_which: MagicMock,
+        fake_mpqcli: str,
+        temp_staging: Path,
+        tmp_path: Path,
+    ):
+        """Several package_mpq_async calls can be gathered in one event loop."""
+        mock_which.return_value = fake_mpqcli
+        create_staging_area(temp_staging)
+        (temp_staging / "DBFilesClient" / "Spell.dbc").write_bytes(b"DBC")
+        outputs = [tmp_path / f"patch-{i}.mpq" for i in range(3)]
+
+        async def build_all():
+            await asyncio.gather(
+                *(package_mpq_async(temp_staging, out) for out in outputs)
+            )
+
+        asyncio.run(build_all())
+
+        assert all(out.read_bytes() == b"fake mpq" for out in outputs)
+
+    @pytest.mark.skipif(os.name == "nt", reason="fake mpqcli is a shell script")
+    @patch("shutil.which")
+    def test_package_async_reports_mpqcli_failure(
+        self,
+        mock_which: MagicMock,
+        fake_mpqcli: str,
+        temp_staging: Path,
+        tmp_path: Path,
+    ):
+        """A non-zero mpqcli exit should raise MPQError carrying its stderr."""
+        mock_which.return_value = fake_mpqcli
+        create_staging_area(temp_staging)
+        (temp_staging / "FAIL").write_bytes(b"")
+
+        with pytest.raises(MPQError, match="exit code 2") as excinfo:
+            asyncio.run(package_mpq_async(temp_staging, tmp_path / "output.mpq"))
+
+        assert "archive error" in str(excinfo.value)
+
+
+class TestMpqcliSymlinkProbe:
+    """Tests for the cached probe behind dereference_mode="auto"."""
+
+    @pytest.fixture
+    def mpqcli(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+        """Create a stand-in mpqcli binary and an isolated cache directory."""
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+        binary = tmp_path / "bin" / "mpqcli"
+        binary.parent.mkdir()
+        binary.write_text("#!/bin/sh\n")
+        return binary
+
+    @staticmethod
+    def probe_runner(stores_link: bool) -> FakeRunner:
+        """Return a runner whose mpqcli list output includes the probe link if asked."""
+
+        def run(cmd, **kwargs):
+            stdout = "probe_link.txt\n" if stores_link and cmd[1] == "list" else ""
+            return subprocess.CompletedProcess(cmd, 0, stdout, "")
+
+        return FakeRunner(run)
+
+    @staticmethod
+    def cache_file(tmp_path: Path) -> Path:
+        return tmp_path / "cache" / "build-mpq" / "mpqcli_probe"
+
+    def test_probe_result_is_persisted(self, mpqcli: Path, tmp_path: Path):
+        """The probe should run mpqcli create and list, then be answered from the cache."""
+        runner = self.probe_runner(stores_link=True)
+
+        assert operations._mpqcli_follows_symlinks(str(mpqcli), runner=runner)
+        assert [args[0][1] for args, _ in runner.calls] == ["create", "list"]
+        key = f"{mpqcli}\t{mpqcli.stat().st_mtime_ns}"
+        assert self.cache_file(tmp_path).read_text(encoding="utf-8") == f"{key}\t1"
+
+        # A new process (simulated by the reset) reads the cache file instead of probing
+        reset_mpqcli_cache()
+        runner = self.probe_runner(stores_link=False)
+        assert operations._mpqcli_follows_symlinks(str(mpqcli), runner=runner)
+        assert runner.calls == []
+
+    def test_cache_for_other_binary_is_ignored(self, mpqcli: Path, tmp_path: Path):
+        """A cache entry written for a different mpqcli path should not be used."""
+        other = tmp_path / "bin" / "other-mpqcli"
+        other.write_text("#!/bin/sh\n")
+        operations._mpqcli_follows_symlinks(str(other), runner=self.probe_runner(stores_link=True))
+        reset_mpqcli_cache()
+
+        runner = self.probe_runner(stores_link=False)
+        assert not operations._mpqcli_follows_symlinks(str(mpqcli), runner=runner)
+        assert len(runner.calls) == 2
+
+    def test_stale_mtime_triggers_new_probe(self, mpqcli: Path):
+        """Replacing mpqcli (a new modification time) should invalidate the cache."""
+        operations._mpqcli_follows_symlinks(str(mpqcli), runner=self.probe_runner(stores_link=True))
+        reset_mpqcli_cache()
+
+        mtime_ns = mpqcli.stat().st_mtime_ns + 1_000_000_000
+        os.utime(mpqcli, ns=(mtime_ns, mtime_ns))
+
+        runner = self.probe_runner(stores_link=False)
+        assert not operations._mpqcli_follows_symlinks(str(mpqcli), runner=runner)
+        assert len(runner.calls) == 2
+
+    @pytest.mark.parametrize("content", ["garbage", "", b"\xff\xfe\x00"])
+    def test_corrupt_cache_triggers_new_probe(self, mpqcli: Path, tmp_path: Path, content):
+        """An unreadable or malformed cache file should be replaced by a fresh probe."""
+        cache_file = self.cache_file(tmp_path)
+        cache_file.parent.mkdir(parents=True)
+        if isinstance(content, bytes):
+            cache_file.write_bytes(content)
+        else:
+            cache_file.write_text(content, encoding="utf-8")
+
+        runner = self.probe_runner(stores_link=True)
+        assert operations._mpqcli_follows_symlinks(str(mpqcli), runner=runner)
+        assert len(runner.calls) == 2
+        assert cache_file.read_text(encoding="utf-8").endswith("\t1")
+
+    def test_probe_failure_means_no_follow(self, mpqcli: Path, tmp_path: Path):
+        """If mpqcli fails during the probe, the dereferenced copy should be kept."""
+
+        def fail(cmd, **kwargs):
+            raise subprocess.CalledProcessError(1, cmd, "", "boom")
+
+        assert not operations._mpqcli_follows_symlinks(str(mpqcli), runner=FakeRunner(fail))
+        assert self.cache_file(tmp_path).read_text(encoding="utf-8").endswith("\t0")
+
+    @patch("shutil.which")
+    def test_auto_mode_probes_with_the_given_runner(
+        self,
+        mock_which: MagicMock,
+        mpqcli: Path,
+        populated_staging: Path,
+        tmp_path: Path,
+    ):
+        """package_mpq in auto mode should not run the real mpqcli for its probe."""
+        mock_which.return_value = str(mpqcli)
+        (populated_staging / "DBFilesClient" / "Link.dbc").symlink_to(
+            populated_staging / "DBFilesClient" / "test.dbc"
+        )
+        output = tmp_path / "output.mpq"
+
+        def run(cmd, **kwargs):
+            if cmd[1] == "list":
+                return subprocess.CompletedProcess(cmd, 0, "probe_link.txt\n", "")
+            if cmd[3] == os.fspath(output):
+                output.write_bytes(b"fake mpq data")
+            return subprocess.CompletedProcess(cmd, 0, "", "")
+
+        runner = FakeRunner(run)
+        package_mpq(populated_staging, output, dereference_mode="auto", runner=runner)
+
+        subcommands = [args[0][1] for args, _ in runner.calls]
+        assert subcommands == ["create", "list", "create"]
+        assert Path(runner.calls[-1][1]["cwd"]) == populated_staging
+
 
 class TestValidateMPQ:
     """Tests for validate_mpq function."""
@@ -539,17 +1281,13 @@ class TestValidateMPQ:
             validate_mpq(mpq)
 
     @patch("shutil.which")
-    @patch("subprocess.run")
+    @patch("subprocess.Popen")
     def test_validates_valid_paths(
-        self, mock_run: MagicMock, mock_which: MagicMock, tmp_path: Path
+        self, mock_popen: MagicMock, mock_which: MagicMock, tmp_path: Path
     ):
         """Test validation of an MPQ with valid file paths."""
         mock_which.return_value = "/usr/bin/mpqcli"
-        mock_run.return_value = MagicMock(
-            returncode=0,
-            stdout="DBFilesClient/Spell.dbc\nInterface/Icons/spell.blp\n",
-            stderr="",
-        )
+        mock_mpqcli_list(mock_popen, "DBFilesClient/Spell.dbc\nInterface/Icons/spell.blp\n")
 
         mpq = tmp_path / "test.mpq"
         mpq.write_bytes(b"fake mpq")
@@ -558,17 +1296,13 @@ class TestValidateMPQ:
         assert result is True
 
     @patch("shutil.which")
-    @patch("subprocess.run")
+    @patch("subprocess.Popen")
     def test_raises_validation_error_for_invalid_paths(
-        self, mock_run: MagicMock, mock_which: MagicMock, tmp_path: Path
+        self, mock_popen: MagicMock, mock_which: MagicMock, tmp_path: Path
     ):
         """Test that ValidationError is raised for invalid paths."""
         mock_which.return_value = "/usr/bin/mpqcli"
-        mock_run.return_value = MagicMock(
-            returncode=0,
-            stdout="InvalidFolder/file.txt\nAnotherInvalid/test.dbc\n",
-            stderr="",
-        )
+        mock_mpqcli_list(mock_popen, "InvalidFolder/file.txt\nAnotherInvalid/test.dbc\n")
 
         mpq = tmp_path / "test.mpq"
         mpq.write_bytes(b"fake mpq")
@@ -576,18 +1310,44 @@ class TestValidateMPQ:
         with pytest.raises(ValidationError, match="invalid locations"):
             validate_mpq(mpq)
 
+    @pytest.mark.parametrize("verbose", [False, True])
     @patch("shutil.which")
-    @patch("subprocess.run")
+    @patch("subprocess.Popen")
+    def test_counts_lines_split_across_blocks(
+        self,
+        mock_popen: MagicMock,
+        mock_which: MagicMock,
+        verbose: bool,
+        tmp_path: Path,
+        caplog,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        """Lines cut at a block boundary are classified as a whole."""
+        caplog.set_level(logging.INFO, logger="build_mpq")
+        monkeypatch.setattr(operations, "_LISTING_BLOCK_SIZE", 5)
+        mock_which.return_value = "/usr/bin/mpqcli"
+        mock_mpqcli_list(
+            mock_popen,
+            "Interface\\Icons\\spell.blp\r\n\n  DBFilesClient\nInterfaceX/a\nSound/Music/a.mp3",
+        )
+
+        mpq = tmp_path / "test.mpq"
+        mpq.write_bytes(b"fake mpq")
+
+        with pytest.raises(ValidationError, match="^1 file"):
+            validate_mpq(mpq, verbose=verbose)
+
+        assert "Valid files:   3" in caplog.text
+        assert "  - InterfaceX/a" in caplog.text
+
+    @patch("shutil.which")
+    @patch("subprocess.Popen")
     def test_handles_empty_mpq(
-        self, mock_run: MagicMock, mock_which: MagicMock, tmp_path: Path
+        self, mock_popen: MagicMock, mock_which: MagicMock, tmp_path: Path
     ):
         """Test validation of an empty MPQ."""
         mock_which.return_value = "/usr/bin/mpqcli"
-        mock_run.return_value = MagicMock(
-            returncode=0,
-            stdout="",
-            stderr="",
-        )
+        mock_mpqcli_list(mock_popen, "")
 
         mpq = tmp_path / "test.mpq"
         mpq.write_bytes(b"fake mpq")
@@ -596,23 +1356,77 @@ class TestValidateMPQ:
         assert result is True
 
     @patch("shutil.which")
-    @patch("subprocess.run")
+    @patch("subprocess.Popen")
     def test_verbose_mode(
-        self, mock_run: MagicMock, mock_which: MagicMock, tmp_path: Path, capsys
+        self, mock_popen: MagicMock, mock_which: MagicMock, tmp_path: Path, caplog
     ):
         """Test that verbose mode prints file details."""
+        caplog.set_level(logging.INFO, logger="build_mpq")
         mock_which.return_value = "/usr/bin/mpqcli"
-        mock_run.return_value = MagicMock(
-            returncode=0,
-            stdout="DBFilesClient/Spell.dbc\nInterface/Icons/spell.blp\n",
-            stderr="",
-        )
+        mock_mpqcli_list(mock_popen, "DBFilesClient/Spell.dbc\nInterface/Icons/spell.blp\n")
 
         mpq = tmp_path / "test.mpq"
         mpq.write_bytes(b"fake mpq")
 
         validate_mpq(mpq, verbose=True)
 
-        captured = capsys.readouterr()
-        assert "✓" in captured.out
-        assert "DBFilesClient/Spell.dbc" in captured.out
+        assert "✓" in caplog.text
+        assert "DBFilesClient/Spell.dbc" in caplog.text
+
+    @patch("shutil.which")
+    @patch("subprocess.Popen")
+    def test_raises_mpq_error_on_mpqcli_failure(
+        self, mock_popen: MagicMock, mock_which: MagicMock, tmp_path: Path
+    ):
+        """Test that a failing mpqcli list raises MPQError with the exit code."""
+        mock_which.return_value = "/usr/bin/mpqcli"
+        mock_mpqcli_list(mock_popen, "", returncode=3)
+
+        mpq = tmp_path / "test.mpq"
+        mpq.write_bytes(b"fake mpq")
+
+        with pytest.raises(MPQError, match="exit code 3"):
+            validate_mpq(mpq)
+
+    @patch("shutil.which")
+    @patch("subprocess.Popen")
+    def test_mpqcli_lookup_is_cached(
+        self, mock_popen: MagicMock, mock_which: MagicMock, tmp_path: Path
+    ):
+        """Test that PATH is searched once and mpqcli is executed by absolute path."""
+        mock_which.return_value = "/usr/bin/mpqcli"
+        mock_mpqcli_list(mock_popen, "DBFilesClient/Spell.dbc\n")
+
+        mpq = tmp_path / "test.mpq"
+        mpq.write_bytes(b"fake mpq")
+
+        validate_mpq(mpq)
+        validate_mpq(mpq)
+
+        mock_which.assert_called_once_with("mpqcli")
+        assert mock_popen.call_args.kwargs["executable"] == "/usr/bin/mpqcli"
+
+    @patch("shutil.which")
+    @patch("subprocess.Popen")
+    def test_missing_mpqcli_is_looked_up_again(
+        self, mock_popen: MagicMock, mock_which: MagicMock, tmp_path: Path
+    ):
+        """Test that a failed lookup is retried, and reset_mpqcli_cache forces a new one."""
+        mock_which.return_value = None
+        mock_mpqcli_list(mock_popen, "DBFilesClient/Spell.dbc\n")
+
+        mpq = tmp_path / "test.mpq"
+        mpq.write_bytes(b"fake mpq")
+
+        with pytest.raises(MPQCliNotFoundError):
+            validate_mpq(mpq)
+
+        mock_which.return_value = "/usr/bin/mpqcli"
+        validate_mpq(mpq)
+
+        mock_which.return_value = "/opt/mpqcli/bin/mpqcli"
+        reset_mpqcli_cache()
+        validate_mpq(mpq)
+
+        assert mock_which.call_count == 3
+        assert mock_popen.call_args.kwargs["executable"] == "/opt/mpqcli/bin/mpqcli"
@@ -4,6 +4,7 @@ from build_mpq.structure import (
     CATEGORIES,
     WOW_335_STRUCTURE,
     get_available_categories,
+    get_leaf_directories,
     get_valid_directories,
     is_valid_path,
 )
@@ -70,12 +71,31 @@ def test_get_valid_directories_with_categories():
     assert "Fonts" in multi_dirs
 
 
+def test_get_valid_directories_keeps_category_order():
+    """Test that directories are returned in the order the categories are given."""
+    dirs = get_valid_directories(["world", "dbc"])
+    assert dirs == [*CATEGORIES["world"], *CATEGORIES["dbc"]]
+    assert get_valid_directories(["dbc", "world"]) == [*CATEGORIES["dbc"], *CATEGORIES["world"]]
+
+
 def test_get_valid_directories_invalid_category():
     """Test that invalid categories are silently ignored."""
     dirs = get_valid_directories(["invalid_category"])
     assert len(dirs) == 0
 
 
+def test_get_leaf_directories_drops_ancestors():
+    """Test that leaf directories cover the structure without ancestor entries."""
+    leaves = get_leaf_directories()
+    assert set(leaves) <= set(WOW_335_STRUCTURE)
+    for directory in WOW_335_STRUCTURE:
+        assert any(leaf == directory or leaf.startswith(directory + "/") for leaf in leaves)
+    for leaf in leaves:
+        assert not any(other.startswith(leaf + "/") for other in leaves)
+
+    assert get_leaf_directories(["dbc"]) == ("DBFilesClient",)
+
+
 def test_is_valid_path_with_valid_paths():
     """Test is_valid_path with known valid paths."""
     valid_paths = [
@@ -120,6 +140,14 @@ def test_is_valid_path_with_directory_only():
     assert not is_valid_path("InvalidDir")
 
 
+def test_is_valid_path_with_categories():
+    """Test that is_valid_path can be restricted to some categories."""
+    assert is_valid_path("DBFilesClient/Spell.dbc", categories=["dbc"])
+    assert is_valid_path("Interface/Icons/spell.blp", categories=["dbc", "interface"])
+    assert not is_valid_path("Interface/Icons/spell.blp", categories=["dbc"])
+    assert not is_valid_path("Interface", categories=["interface"])
+
+
 def test_structure_no_duplicates():
     """Test that there are no duplicate entries in the structure."""
     assert len(WOW_335_STRUCTURE) == len(set(WOW_335_STRUCTURE))